@@ -2,7 +2,7 @@
 from .seed import set_seed
 from .logging import DualLogger
 from .repro import write_repro_manifest
-from .io import load_json, save_json, load_jsonl, save_jsonl
+from .io import load_json, save_json, load_jsonl, save_jsonl, iter_jsonl, count_jsonl, JsonlWriter
 from .metrics import (
     make_two_level_metrics,
     save_metrics,
@@ -19,6 +19,9 @@ __all__ = [
     "save_json",
     "load_jsonl",
     "save_jsonl",
+    "iter_jsonl",
+    "count_jsonl",
+    "JsonlWriter",
     "make_two_level_metrics",
     "save_metrics",
     "validate_metrics",
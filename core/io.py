@@ -1,7 +1,16 @@
 """I/O utilities: load/save JSON, JSONL."""
 import json
+import os
+import re
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator, TextIO
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 
 def load_json(path: Path) -> Any:
@@ -10,24 +19,80 @@ def load_json(path: Path) -> Any:
 
 
 def save_json(obj: Any, path: Path) -> None:
+    """Write indented JSON atomically (sibling temp file + os.replace): readers never see a partial file."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(obj, f, indent=2, ensure_ascii=False)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(obj, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
 
 
 def load_jsonl(path: Path) -> list:
-    data = []
+    return list(iter_jsonl(path))
+
+
+# 19 位以上的数字串可能是超出 64 位的整数：orjson 会把它静默解析成 float，这类行交给 stdlib
+_LONG_DIGITS_RE = re.compile(rb"\d{19}")
+
+
+def _loads_line(line: bytes) -> Any:
+    if _LONG_DIGITS_RE.search(line):
+        return json.loads(line)
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError:
+        # orjson 比 stdlib 严格（如 NaN/Infinity）；此类行回落到 json.loads 保持原行为
+        return json.loads(line)
+
+
+def iter_jsonl(path: Path) -> Iterator[Any]:
+    """Stream JSONL rows one at a time (orjson when available, stdlib json semantics)."""
     if not path.exists():
-        return data
-    with open(path, "r", encoding="utf-8") as f:
+        return
+    loads = _loads_line if HAS_ORJSON else json.loads
+    with open(path, "rb") as f:
         for line in f:
             if line.strip():
-                data.append(json.loads(line))
-    return data
+                yield loads(line)
+
+
+def count_jsonl(path: Path) -> int:
+    """Count non-empty lines without decoding JSON (same rows as load_jsonl)."""
+    if not path.exists():
+        return 0
+    with open(path, "rb") as f:
+        return sum(1 for line in f if line.strip())
 
 
 def save_jsonl(data: list, path: Path) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     with open(path, "w", encoding="utf-8") as f:
-        for item in data:
-            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+        f.writelines(json.dumps(item, ensure_ascii=False) + "\n" for item in data)
+
+
+class JsonlWriter:
+    """Write JSONL rows one at a time as they are produced (same line format as save_jsonl)."""
+
+    def __init__(self, path: Path, buffering: int = 1 << 20) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._f: TextIO = open(path, "w", encoding="utf-8", buffering=buffering)
+
+    def write(self, item: Any) -> None:
+        self._f.write(json.dumps(item, ensure_ascii=False) + "\n")
+
+    def write_line(self, line: str) -> None:
+        """Append an already-encoded JSON line (must end with a newline)."""
+        self._f.write(line)
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
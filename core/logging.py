@@ -1,23 +1,31 @@
 """Dual logging: console + runs/<exp_id>/run.log."""
 import sys
+import threading
 from pathlib import Path
 from typing import Optional
 
 
 class DualLogger:
-    """Log to both console and a file."""
+    """Log to both console and a file.
+
+    Safe to call from worker threads: a lock keeps each line whole and in the same order
+    on both sinks. run.log is line-buffered, so every complete line reaches disk with a
+    single write and no extra flush.
+    """
 
     def __init__(self, run_dir: Path, log_name: str = "run.log"):
         self.log_path = Path(run_dir) / log_name
         self.log_path.parent.mkdir(parents=True, exist_ok=True)
         self._file = open(self.log_path, "w", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
 
     def log(self, msg: str) -> None:
         line = msg if msg.endswith("\n") else msg + "\n"
-        sys.stdout.write(line)
-        sys.stdout.flush()
-        self._file.write(line)
-        self._file.flush()
+        with self._lock:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+            self._file.write(line)
 
     def close(self) -> None:
-        self._file.close()
+        with self._lock:
+            self._file.close()
@@ -3,6 +3,8 @@ import csv
 from pathlib import Path
 from typing import Any, Optional
 
+from .io import save_json
+
 
 def make_two_level_metrics(
     total: dict,
@@ -57,12 +59,8 @@ def validate_metrics(metrics: dict) -> None:
 
 
 def save_metrics(metrics: dict, path: Path) -> None:
-    """Persist metrics after basic filesystem setup."""
-    path.parent.mkdir(parents=True, exist_ok=True)
-    import json
-
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(metrics, f, indent=2, ensure_ascii=False)
+    """Persist metrics (atomically, via core.io.save_json)."""
+    save_json(metrics, path)
 
 
 def validate_audit_artifacts(
@@ -6,6 +6,7 @@ import platform
 import socket
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Sequence
@@ -33,9 +34,12 @@ def get_platform_info() -> dict:
 
 
 def _sha256_file(path: Path) -> str:
-    h = hashlib.sha256()
     with open(path, "rb") as f:
-        for chunk in iter(lambda: f.read(65536), b""):
+        if hasattr(hashlib, "file_digest"):
+            # Python 3.11+: reads straight into OpenSSL's buffer, no per-chunk bytes objects
+            return hashlib.file_digest(f, "sha256").hexdigest()
+        h = hashlib.sha256()
+        for chunk in iter(lambda: f.read(1 << 20), b""):
             h.update(chunk)
     return h.hexdigest()
 
@@ -120,17 +124,22 @@ def write_repro_manifest(
     python_version_full = get_python_version()
     pip_freeze = get_pip_freeze()
 
-    # Hash inputs
+    # Hash inputs (I/O bound: overlap reads across a small thread pool)
     input_hashes: Dict[str, str] = {}
     warn_list: List[str] = list(warnings or [])
-    for p in inputs or []:
-        p = Path(p)
+    input_paths = [Path(p) for p in inputs or []]
+    existing = [p for p in input_paths if p.exists()]
+    futures = {}
+    if existing:
+        with ThreadPoolExecutor(max_workers=min(8, len(existing))) as pool:
+            futures = {p: pool.submit(_sha256_file, p) for p in existing}
+    for p in input_paths:
         label = normalize_input_key(p, project_root, old_dir=old_dir, data_file=data_file)
-        if not p.exists():
+        if p not in futures:
             warn_list.append(f"Input missing: {p}")
             continue
         try:
-            input_hashes[label] = _sha256_file(p)
+            input_hashes[label] = futures[p].result()
         except Exception as e:  # pragma: no cover - defensive
             warn_list.append(f"Failed to hash {p}: {e!r}")
 
@@ -0,0 +1,115 @@
+"""Fast EM/F1 path, score-for-score equivalent to framework.eval.
+
+Pure Python: the speedup comes from memoisation and an optional regex tokenizer,
+not from JIT / compiled code.
+
+framework/eval.py is the reference implementation and stays untouched (its sha256
+is recorded in metrics.audit). This module reuses its normalize_answer and
+mixed_segmentation and only removes repeated work: each distinct answer / gold
+string is normalized and tokenized once (lru_cache).
+
+The fast tokenizer (precompiled CJK class instead of a per-character Python scan)
+is opt-in via CWKGQA_FAST_TOKENIZE=1, and is only used while framework/eval.py
+still matches REFERENCE_EVAL_SHA256; otherwise the reference mixed_segmentation
+is used. TOKENIZER_IMPL records which one is active.
+
+tests/test_eval_fast.py checks evaluate_prediction against
+framework.eval.evaluate_prediction.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from pathlib import Path
+from typing import List, Tuple
+import functools
+import hashlib
+import os
+import re
+
+from . import eval as _ref_eval  # type: ignore
+from .eval import mixed_segmentation, normalize_answer  # type: ignore
+
+
+# sha256 of framework/eval.py; segment_fast is only verified against this normalize_answer
+REFERENCE_EVAL_SHA256 = "f6899e6891400e9a9b742ddafbcaa4a3b7438552c01b4bc482eed444ada04dba"
+
+_CJK_RE = re.compile("[\u4e00-\u9fff]")
+
+
+def _file_sha256(path: str) -> str:
+    try:
+        return hashlib.sha256(Path(path).resolve().read_bytes()).hexdigest()
+    except Exception:
+        return ""
+
+
+def segment_fast(norm: str) -> List[str]:
+    """mixed_segmentation on normalize_answer output.
+
+    After normalization the only whitespace left is single spaces, so the
+    character-level (CJK) branch is the string without spaces.
+    """
+    if _CJK_RE.search(norm):
+        return list(norm.replace(" ", ""))
+    return norm.split()
+
+
+def _fast_tokenize_enabled() -> bool:
+    if os.getenv("CWKGQA_FAST_TOKENIZE", "").strip() != "1":
+        return False
+    return _file_sha256(_ref_eval.__file__) == REFERENCE_EVAL_SHA256
+
+
+if _fast_tokenize_enabled():
+    segment_normalized = segment_fast
+    TOKENIZER_IMPL = "fast"
+else:
+    segment_normalized = mixed_segmentation
+    TOKENIZER_IMPL = "reference"
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def eval_view(text: str) -> Tuple[str, Counter]:
+    """(normalize_answer(text), token counts); shared by EM and F1 and across samples."""
+    norm = normalize_answer(text)
+    return norm, Counter(segment_normalized(norm))
+
+
+def evaluate_prediction(prediction, gold_answers):
+    """Same (em, f1) values and types as framework.eval.evaluate_prediction.
+
+    Like the reference, an empty gold_answers raises ValueError (max of an empty list).
+    """
+    pred_norm, pred_counts = eval_view(str(prediction))
+    n_pred = sum(pred_counts.values())
+    ems = []
+    f1s = []
+    for gold in gold_answers:
+        gold_norm, gold_counts = eval_view(str(gold))
+        ems.append(pred_norm == gold_norm)
+        num_same = sum((pred_counts & gold_counts).values())
+        if num_same == 0:
+            f1s.append(0)
+            continue
+        precision = 1.0 * num_same / n_pred
+        recall = 1.0 * num_same / sum(gold_counts.values())
+        f1s.append((2 * precision * recall) / (precision + recall))
+    return max(ems), max(f1s)
+
+
+@functools.lru_cache(maxsize=1)
+def get_module_sha256() -> str:
+    """sha256 of this module file, recorded in metrics.audit next to eval.py's."""
+    return _file_sha256(__file__)
+
+
+__all__ = [
+    "REFERENCE_EVAL_SHA256",
+    "TOKENIZER_IMPL",
+    "segment_fast",
+    "segment_normalized",
+    "eval_view",
+    "evaluate_prediction",
+    "get_module_sha256",
+]
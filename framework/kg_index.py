@@ -0,0 +1,351 @@
+"""KG triples and retrieval indexes, with an on-disk cache shared across runs.
+
+Used by scripts/run_exp_baseline.py (retrieval) and scripts/build_kg_cache.py
+(cache prewarming). The cached pickles reference the classes in this module, so
+they load the same way whichever script built them.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+import functools
+import hashlib
+import os
+import pickle
+
+import numpy as np
+
+try:
+    import ahocorasick  # type: ignore
+
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+try:
+    from numba import njit  # type: ignore
+
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+from core import iter_jsonl  # type: ignore
+
+from .utils import RUNS_DIR, ensure_dir
+
+
+@dataclass(slots=True)
+class Triple:
+    subject: str
+    predicate: str
+    obj: str
+
+
+def _normalize_text(s: str | None) -> str:
+    return (s or "").strip()
+
+
+@dataclass
+class TripleStore:
+    """KG 三元组的列式存储（SoA）：subjects/predicates/objects 三列按下标对齐。
+
+    索引构建按列扫描，缓存 pickle 只含三个字符串列表；``Triple`` 仅对检索命中的行按需构造。
+    """
+
+    subjects: List[str]
+    predicates: List[str]
+    objects: List[str]
+
+    def __len__(self) -> int:
+        return len(self.subjects)
+
+    def triple(self, i: int) -> Triple:
+        return Triple(self.subjects[i], self.predicates[i], self.objects[i])
+
+    def take(self, idx: Iterable[int]) -> List[Triple]:
+        return [self.triple(i) for i in idx]
+
+
+def load_kg_triples(path: Path) -> TripleStore:
+    # 逐行流式解析，不保留中间的 rows 列表
+    subjects: List[str] = []
+    predicates: List[str] = []
+    objects: List[str] = []
+    # 谓词集合很小、实体在多行重复出现：相同字符串只保留一个对象，
+    # 常驻内存与 pickle 缓存（按对象 memo）都随之变小
+    pool: Dict[str, str] = {}
+    for r in iter_jsonl(path):
+        s = _normalize_text(r.get("subject") or r.get("head"))
+        p = _normalize_text(r.get("predicate") or r.get("connect"))
+        o = _normalize_text(r.get("object") or r.get("tail"))
+        if not (s or p or o):
+            continue
+        subjects.append(pool.setdefault(s, s))
+        predicates.append(pool.setdefault(p, p))
+        objects.append(pool.setdefault(o, o))
+    return TripleStore(subjects, predicates, objects)
+
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+if HAS_NUMBA:
+
+    # cache=True：编译结果写入 __pycache__，sweep 中每个新进程不必重新 JIT。
+    # 磁盘缓存按定义模块名索引，只在稳定可导入的模块里安全：核函数须留在 framework.kg_index，
+    # 不能放回 run_exp_baseline.py（脚本既作 __main__ 运行，又被测试/工具按 scripts.run_exp_baseline 导入）
+    @njit(cache=True)
+    def _bm25_accumulate(qids, post_ptr, post_doc, post_w, scores):
+        # 按查询 token 顺序逐 term 累加，与 NumPy 路径的浮点加法顺序一致
+        for t in qids:
+            for j in range(post_ptr[t], post_ptr[t + 1]):
+                scores[post_doc[j]] += post_w[j]
+
+
+@dataclass
+class BM25Index:
+    """BM25 语料统计（idf / 倒排 / 文档长度归一项），每个 KG 只构建一次，查询时复用。
+
+    文档为 ``f"{subject} {predicate} {obj}"`` 的空白切分；倒排按 term 分段存放，
+    ``post_ptr[t]:post_ptr[t + 1]`` 即 term t 的 (doc_id, tf) 列表。
+    ``post_w`` 为与查询无关的逐 posting BM25 贡献 idf * tf*(k1+1)/(tf+norm)，
+    查询时只需按 term 累加。
+    """
+
+    vocab: Dict[str, int]
+    idf: np.ndarray
+    post_ptr: np.ndarray
+    post_doc: np.ndarray
+    post_tf: np.ndarray
+    norm: np.ndarray
+    post_w: np.ndarray
+    n_docs: int
+
+    @classmethod
+    def build(cls, store: TripleStore) -> "BM25Index":
+        import math
+
+        vocab: Dict[str, int] = {}
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        tfs: List[int] = []
+        dls: List[int] = []
+        for i, (s, p, o) in enumerate(zip(store.subjects, store.predicates, store.objects)):
+            tokens = f"{s} {p} {o}".strip().split()
+            dls.append(len(tokens))
+            for tok, c in Counter(tokens).items():
+                term_ids.append(vocab.setdefault(tok, len(vocab)))
+                doc_ids.append(i)
+                tfs.append(c)
+
+        n_docs = len(store)
+        term_arr = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(term_arr, kind="stable")
+        df = np.bincount(term_arr, minlength=len(vocab))
+        post_ptr = np.zeros(len(vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=post_ptr[1:])
+        # idf 与原逐查询实现逐位一致（math.log，而非 np.log）
+        idf = np.array(
+            [math.log((n_docs - c + 0.5) / (c + 0.5) + 1.0) for c in df.tolist()],
+            dtype=np.float64,
+        )
+        avgdl = sum(dls) / n_docs if n_docs else 0.0
+        dl = np.asarray(dls, dtype=np.float64)
+        if avgdl > 0:
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * dl / avgdl)
+        else:
+            norm = np.full(n_docs, BM25_K1, dtype=np.float64)
+        post_doc = np.asarray(doc_ids, dtype=np.int64)[order]
+        post_tf = np.asarray(tfs, dtype=np.float64)[order]
+        post_w = idf[term_arr[order]] * (post_tf * (BM25_K1 + 1) / (post_tf + norm[post_doc]))
+        return cls(
+            vocab=vocab,
+            idf=idf,
+            post_ptr=post_ptr,
+            post_doc=post_doc,
+            post_tf=post_tf,
+            norm=norm,
+            post_w=post_w,
+            n_docs=n_docs,
+        )
+
+    def score(self, q_tokens: List[str], out: np.ndarray | None = None) -> np.ndarray:
+        """返回长度为 n_docs 的 BM25 分数向量（未命中为 0）。
+
+        out: 可复用的 float64 缓冲区（批量查询时避免每条问题分配 n_docs 大小的数组），会被清零后写入。
+        """
+        if out is None:
+            scores = np.zeros(self.n_docs, dtype=np.float64)
+        else:
+            scores = out
+            scores.fill(0.0)
+        vocab = self.vocab
+        qids = [vocab[qt] for qt in q_tokens if qt in vocab]
+        if not qids:
+            return scores
+        if HAS_NUMBA:
+            _bm25_accumulate(np.asarray(qids, dtype=np.int64), self.post_ptr, self.post_doc, self.post_w, scores)
+            return scores
+        for t in qids:
+            lo, hi = self.post_ptr[t], self.post_ptr[t + 1]
+            scores[self.post_doc[lo:hi]] += self.post_w[lo:hi]
+        return scores
+
+
+@dataclass
+class LexicalIndex:
+    """simple 检索器的实体倒排：subject/object 字符串 → 三元组下标。
+
+    有 pyahocorasick 时用 Aho–Corasick 自动机一次线性扫描问题找出全部命中实体；
+    否则退化为对去重后的实体串逐个做子串判断。
+    """
+
+    subj_docs: Dict[str, List[int]]
+    obj_docs: Dict[str, List[int]]
+    entities: List[str]
+    automaton: Any = None
+    n_docs: int = 0
+
+    @classmethod
+    def build(cls, store: TripleStore) -> "LexicalIndex":
+        subj_docs: Dict[str, List[int]] = {}
+        obj_docs: Dict[str, List[int]] = {}
+        for i, s in enumerate(store.subjects):
+            if s:
+                subj_docs.setdefault(s, []).append(i)
+        for i, o in enumerate(store.objects):
+            if o:
+                obj_docs.setdefault(o, []).append(i)
+        entities = list(dict.fromkeys([*subj_docs, *obj_docs]))
+        automaton = None
+        if HAS_AHOCORASICK and entities:
+            automaton = ahocorasick.Automaton()
+            for ent in entities:
+                automaton.add_word(ent, ent)
+            automaton.make_automaton()
+        return cls(subj_docs, obj_docs, entities, automaton, len(store))
+
+    def matched_entities(self, q: str) -> Iterable[str]:
+        """问题中作为子串出现的实体（去重；同一实体多次出现只计一次）。"""
+        if self.automaton is not None:
+            return {ent for _, ent in self.automaton.iter(q)}
+        return [ent for ent in self.entities if ent in q]
+
+    def score(self, q: str) -> Dict[int, float]:
+        """返回 {triple_idx: score}，score = 命中的 subject 长度 + 命中的 object 长度。"""
+        scores: Dict[int, float] = {}
+        for ent in self.matched_entities(q):
+            n = len(ent)
+            for i in self.subj_docs.get(ent, ()):
+                scores[i] = scores.get(i, 0.0) + n
+            for i in self.obj_docs.get(ent, ()):
+                scores[i] = scores.get(i, 0.0) + n
+        return scores
+
+
+# 所有跨运行缓存（KG 索引、生成结果库、batch 输入）统一放在 runs/.cache 下，由 .gitignore 整体忽略
+CACHE_DIR = RUNS_DIR / ".cache"
+KG_CACHE_DIR = CACHE_DIR / "kg"
+# 索引结构（BM25Index / LexicalIndex / TripleStore 字段）或其所在模块变化时递增，使旧缓存失效
+KG_CACHE_VERSION = 3
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return -1
+
+
+@functools.lru_cache(maxsize=8)
+def _file_sha256(path: str, mtime_ns: int) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def kg_cache_path(path: Path) -> Path:
+    """KG 文件对应的缓存 pickle 路径（不保证存在）。"""
+    # 以文件内容 sha256 为键：checkout/拷贝只改 mtime 时仍命中，内容变化时必然失效；
+    # 内容哈希本身按 (路径, mtime) 记忆化，同一进程内的 sweep 不再每次重读整个 KG 文件
+    digest = _file_sha256(str(path), _mtime_ns(path))
+    # 是否带 Aho–Corasick 自动机也计入键，避免跨环境复用到不可反序列化/退化的索引
+    return KG_CACHE_DIR / f"kg_{digest[:16]}_v{KG_CACHE_VERSION}_ac{int(HAS_AHOCORASICK)}.pkl"
+
+
+def load_kg_with_indexes(
+    path: Path,
+    need_bm25: bool,
+    need_lexical: bool,
+    use_cache: bool = True,
+) -> Tuple[TripleStore, BM25Index | None, LexicalIndex | None, bool]:
+    """加载 KG 及所需检索索引；以 KG 内容 sha256 为键缓存到 runs/.cache/kg，跨运行复用。
+
+    缓存缺失、损坏或缺少所需索引时重新构建并回写（先写临时文件再 os.replace）。
+    末项为 cache_hit：所需内容是否全部来自磁盘缓存。
+    """
+    bundle: Dict[str, Any] = {}
+    cache_path = kg_cache_path(path) if use_cache and path.exists() else None
+    if cache_path is not None and cache_path.exists():
+        try:
+            with open(cache_path, "rb") as f:
+                bundle = pickle.load(f)
+        except Exception:
+            bundle = {}
+
+    dirty = False
+    if "triples" not in bundle:
+        bundle = {"triples": load_kg_triples(path)}
+        dirty = True
+    triples: TripleStore = bundle["triples"]
+    if need_bm25 and "bm25" not in bundle:
+        bundle["bm25"] = BM25Index.build(triples)
+        dirty = True
+    if need_lexical and "lexical" not in bundle:
+        bundle["lexical"] = LexicalIndex.build(triples)
+        dirty = True
+
+    if dirty and cache_path is not None and triples:
+        tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            ensure_dir(cache_path.parent)
+            with open(tmp_path, "wb") as f:
+                pickle.dump(bundle, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except Exception:
+            # 缓存仅为加速，写失败不影响本次运行；但不留下写了一半的临时文件
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+
+    return (
+        triples,
+        bundle.get("bm25") if need_bm25 else None,
+        bundle.get("lexical") if need_lexical else None,
+        cache_path is not None and not dirty,
+    )
+
+
+__all__ = [
+    "HAS_AHOCORASICK",
+    "HAS_NUMBA",
+    "Triple",
+    "TripleStore",
+    "load_kg_triples",
+    "BM25_K1",
+    "BM25_B",
+    "BM25Index",
+    "LexicalIndex",
+    "CACHE_DIR",
+    "KG_CACHE_DIR",
+    "KG_CACHE_VERSION",
+    "kg_cache_path",
+    "load_kg_with_indexes",
+]
@@ -0,0 +1,76 @@
+"""Persistent exact-match cache for generator (LLM) responses.
+
+Design:
+- key = sha256(canonical JSON of endpoint base_url / model / contract / messages / sampling params);
+  base_url keeps endpoints that serve the same model name (e.g. Ollama vs vLLM) apart
+- backend = a single SQLite file (default runs/.cache/llm_cache.db), shared across exp_id
+- only successful, non-empty outputs are stored; hits/misses are counted for metrics.audit
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+class LLMCache:
+    """Thread-safe SQLite-backed response cache (one connection, guarded by a lock)."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, attempts INTEGER NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(
+        base_url: str,
+        model: str,
+        contract: str,
+        messages: List[Dict[str, str]],
+        sampling: Dict[str, Any],
+    ) -> str:
+        payload = {"base_url": base_url, "model": model, "contract": contract, "messages": messages, "sampling": sampling}
+        canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Tuple[str, int] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT text, attempts FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0], int(row[1])
+
+    def set(self, key: str, text: str, attempts: int) -> None:
+        if not text:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, text, attempts, created) VALUES (?, ?, ?, ?)",
+                (key, text, int(attempts), time.time()),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": str(self.path), "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+__all__ = ["LLMCache"]
@@ -238,11 +238,13 @@ def main() -> int:
     # id_integrity_report
     ids = [s.get("id", "") for s in samples]
     unique_ids = set(ids)
+    # 一次计数代替对每个 id 调 ids.count（O(n²)）；输出顺序仍按 unique_ids 迭代
+    id_counts = Counter(ids)
     id_report = {
         "n": len(samples),
         "n_unique_ids": len(unique_ids),
         "has_duplicates": len(unique_ids) != len(samples),
-        "duplicate_ids": [i for i in unique_ids if ids.count(i) > 1],
+        "duplicate_ids": [i for i in unique_ids if id_counts[i] > 1],
     }
     (artifacts_dir / "id_integrity_report.json").write_text(
         json.dumps(id_report, ensure_ascii=False, indent=2), encoding="utf-8"
@@ -256,15 +258,21 @@ def main() -> int:
         norm_preds.append(norm)
     total_n = len(norm_preds)
 
-    def _rate(cond) -> float:
-        cnt = sum(1 for p in norm_preds if cond(p))
-        return cnt / total_n if total_n else 0.0
-
     import re
 
-    unknown_rate = _rate(lambda p: p.lower() == "unknown")
-    very_short_rate = _rate(lambda p: len(mixed_segmentation(p)) <= 1)
-    numeric_only_rate = _rate(lambda p: bool(p) and re.fullmatch(r"[0-9\\W_]+", p) is not None)
+    # 单次遍历同时统计三类门控计数
+    numeric_only_re = re.compile(r"[0-9\\W_]+")
+    n_unknown = n_very_short = n_numeric_only = 0
+    for p in norm_preds:
+        if p.lower() == "unknown":
+            n_unknown += 1
+        if len(mixed_segmentation(p)) <= 1:
+            n_very_short += 1
+        if p and numeric_only_re.fullmatch(p) is not None:
+            n_numeric_only += 1
+    unknown_rate = n_unknown / total_n if total_n else 0.0
+    very_short_rate = n_very_short / total_n if total_n else 0.0
+    numeric_only_rate = n_numeric_only / total_n if total_n else 0.0
     pred_counter = Counter(norm_preds)
     most_common_count = pred_counter.most_common(1)[0][1] if pred_counter else 0
     duplicated_answer_rate = most_common_count / total_n if total_n else 0.0
@@ -6,16 +6,24 @@
 from __future__ import annotations
 
 import argparse
+import heapq
 import json
 import sys
 from pathlib import Path
 
+import numpy as np
+
 ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from core import save_json  # type: ignore
 from framework.eval import evaluate_prediction  # type: ignore
 
+TOP_K_EXAMPLES = 10
+_POLICY_B = "force_unknown_if_support_lt_0.5"
+_RETRY_ACTIONS = frozenset({"retry", "retry_resolved", "retry_then_force_unknown", "force_unknown"})
+
 
 def _load_jsonl(path: Path) -> list[dict]:
     out = []
@@ -53,7 +61,7 @@ def main() -> int:
     policy = ""
     if metrics_path.exists():
         try:
-            m = json.loads(metrics_path.read_text(encoding="utf-8"))
+            m = json.loads(metrics_path.read_bytes())
             policy = (m.get("audit") or {}).get("enforcement_policy", "")
         except Exception:
             pass
@@ -63,107 +71,125 @@ def main() -> int:
 
     # Fixed logic: retry_trigger_rate based on retry_attempted==true
     # Policy B should not have retry_triggered
-    retry_ids: list[str] = []
-    retry_cases: list[dict] = []
     use_fixed = args.fixed
+    if use_fixed and policy == _POLICY_B:
+        def _keep(s: dict) -> bool:
+            return False  # Policy B: no retry
+    elif use_fixed:
+        def _keep(s: dict) -> bool:
+            return s.get("retry_attempted") is True
+    else:
+        def _keep(s: dict) -> bool:
+            return "raw_answer_retry" in s or (
+                s.get("enforcement_action", "") in _RETRY_ACTIONS and bool(s.get("evidence_violation"))
+            )
+
+    retry_cases: list[dict] = []
+    em_sum = 0
+    f1_sum = 0.0
 
     for s in samples:
-        if use_fixed:
-            if policy == "force_unknown_if_support_lt_0.5":
-                continue  # Policy B: no retry
-            if s.get("retry_attempted") is True:
-                retry_ids.append(s.get("id", ""))
-                retry_cases.append(s)
-        else:
-            action = s.get("enforcement_action", "")
-            has_retry_fields = "raw_answer_retry" in s
-            if has_retry_fields or (action in ("retry", "retry_resolved", "retry_then_force_unknown", "force_unknown") and s.get("evidence_violation")):
-                retry_ids.append(s.get("id", ""))
-                retry_cases.append(s)
+        if s.get("em"):
+            em_sum += 1
+        f1_sum += float(s.get("f1", 0) or 0)
+        if _keep(s):
+            retry_cases.append(s)
 
     n_retry_triggered = len(retry_cases)
     retry_trigger_rate = n_retry_triggered / n_total if n_total else 0.0
 
-    # Outcomes
+    # Outcomes (all stay zero/empty when nothing was retried, e.g. Policy B with --fixed)
     improved = 0
     unchanged = 0
     worsened = 0
     forced_unknown = 0
-    f1_before_list: list[float] = []
-    f1_after_list: list[float] = []
-    em_before_list: list[float] = []
-    em_after_list: list[float] = []
+    retry_resolved = 0
+    retry_then_force = 0
     top_examples: list[dict] = []
-
-    for s in retry_cases:
-        golds = s.get("gold_answers") or []
-        raw_answer = (s.get("raw_answer") or "").strip()
-        raw_retry = (s.get("raw_answer_retry") or "").strip()
-        final_answer = (s.get("final_answer") or s.get("prediction") or "").strip()
-
-        em_before, f1_before = evaluate_prediction(raw_answer, golds)
-        # after_retry = final_answer (stored prediction) and its em/f1
-        em_after = 1 if s.get("em") else 0
-        f1_after = float(s.get("f1", 0.0))
-
-        f1_before_list.append(f1_before)
-        f1_after_list.append(f1_after)
-        em_before_list.append(float(em_before))
-        em_after_list.append(float(em_after))
-
-        action = s.get("enforcement_action", "")
-        if use_fixed:
-            if action == "retry_then_force_unknown":
-                forced_unknown += 1
-            elif action == "retry_resolved":
-                if f1_after > f1_before:
+    mean_f1_before = mean_f1_after = mean_em_before = mean_em_after = 0.0
+
+    if retry_cases:
+        # columns: f1_before, f1_after, em_before, em_after
+        stats = np.empty((n_retry_triggered, 4), dtype=np.float64)
+        top_heap: list[tuple] = []
+
+        for i, s in enumerate(retry_cases):
+            sg = s.get
+            golds = sg("gold_answers") or []
+            v = sg("raw_answer")
+            raw_answer = v.strip() if v else ""
+            v = sg("raw_answer_retry")
+            raw_retry = v.strip() if v else ""
+            v = sg("final_answer") or sg("prediction")
+            final_answer = v.strip() if v else ""
+
+            em_before, f1_before = evaluate_prediction(raw_answer, golds)
+            # after_retry = final_answer (stored prediction) and its em/f1
+            em_after = 1 if sg("em") else 0
+            f1_after = float(sg("f1", 0.0))
+
+            stats[i] = (f1_before, f1_after, float(em_before), float(em_after))
+
+            action = sg("enforcement_action", "")
+            if action == "retry_resolved":
+                retry_resolved += 1
+            elif action == "retry_then_force_unknown":
+                retry_then_force += 1
+            if use_fixed:
+                if action == "retry_then_force_unknown":
+                    forced_unknown += 1
+                elif action == "retry_resolved":
+                    if f1_after > f1_before:
+                        improved += 1
+                    elif f1_after < f1_before:
+                        worsened += 1
+                    else:
+                        unchanged += 1
+            else:
+                if final_answer.upper() == "UNKNOWN":
+                    forced_unknown += 1
+                elif f1_after > f1_before:
                     improved += 1
                 elif f1_after < f1_before:
                     worsened += 1
                 else:
                     unchanged += 1
-        else:
-            if final_answer.upper() == "UNKNOWN":
-                forced_unknown += 1
-            elif f1_after > f1_before:
-                improved += 1
-            elif f1_after < f1_before:
-                worsened += 1
-            else:
-                unchanged += 1
-
-        ex = {
-            "id": s.get("id", ""),
-            "question": s.get("question", ""),
-            "gold": (golds[0] if golds else ""),
-            "raw_answer_before_retry": raw_answer,
-            "evidence_before_retry": s.get("evidence_line_ids", []),
-            "support_before_retry": s.get("evidence_support"),
-            "raw_answer_retry": raw_retry,
-            "evidence_retry": s.get("evidence_line_ids_retry", []),
-            "support_retry": s.get("evidence_support_retry"),
-            "final_answer": final_answer,
-            "em_before": 1 if em_before else 0,
-            "em_after": em_after,
-            "f1_before": f1_before,
-            "f1_after": f1_after,
-        }
-        top_examples.append(ex)
-
-    # Sort by improvement (f1_after - f1_before) desc, then by f1_after desc
-    top_examples.sort(key=lambda x: (x["f1_after"] - x["f1_before"], x["f1_after"]), reverse=True)
-    top_examples = top_examples[:10]
-
-    mean_f1_before = sum(f1_before_list) / len(f1_before_list) if f1_before_list else 0.0
-    mean_f1_after = sum(f1_after_list) / len(f1_after_list) if f1_after_list else 0.0
-    mean_em_before = sum(em_before_list) / len(em_before_list) if em_before_list else 0.0
-    mean_em_after = sum(em_after_list) / len(em_after_list) if em_after_list else 0.0
-
-    overall_em = sum(1 for x in samples if x.get("em")) / n_total if n_total else 0.0
-    overall_f1 = sum(float(x.get("f1", 0)) for x in samples) / n_total if n_total else 0.0
-
-    retry_resolved = sum(1 for s in retry_cases if s.get("enforcement_action") == "retry_resolved")
-    retry_then_force = sum(1 for s in retry_cases if s.get("enforcement_action") == "retry_then_force_unknown")
+
+            # Keep only the current top-10 by (delta, f1_after); ties favour earlier cases
+            entry = (f1_after - f1_before, f1_after, -i, s, raw_answer, raw_retry, final_answer, em_before, f1_before)
+            if len(top_heap) < TOP_K_EXAMPLES:
+                heapq.heappush(top_heap, entry)
+            elif entry[:3] > top_heap[0][:3]:
+                heapq.heapreplace(top_heap, entry)
+
+        # Sort by improvement (f1_after - f1_before) desc, then by f1_after desc
+        for _, f1_after, _, s, raw_answer, raw_retry, final_answer, em_before, f1_before in sorted(
+            top_heap, key=lambda e: e[:3], reverse=True
+        ):
+            golds = s.get("gold_answers") or []
+            top_examples.append(
+                {
+                    "id": s.get("id", ""),
+                    "question": s.get("question", ""),
+                    "gold": (golds[0] if golds else ""),
+                    "raw_answer_before_retry": raw_answer,
+                    "evidence_before_retry": s.get("evidence_line_ids", []),
+                    "support_before_retry": s.get("evidence_support"),
+                    "raw_answer_retry": raw_retry,
+                    "evidence_retry": s.get("evidence_line_ids_retry", []),
+                    "support_retry": s.get("evidence_support_retry"),
+                    "final_answer": final_answer,
+                    "em_before": 1 if em_before else 0,
+                    "em_after": 1 if s.get("em") else 0,
+                    "f1_before": f1_before,
+                    "f1_after": f1_after,
+                }
+            )
+
+        mean_f1_before, mean_f1_after, mean_em_before, mean_em_after = stats.mean(axis=0).tolist()
+
+    overall_em = em_sum / n_total if n_total else 0.0
+    overall_f1 = f1_sum / n_total if n_total else 0.0
 
     report = {
         "n_total": n_total,
@@ -185,13 +211,13 @@ def main() -> int:
             "mean_em_after_retry": mean_em_after,
         },
         "top_examples": top_examples,
-        "list_retry_ids": retry_ids,
+        "list_retry_ids": [s.get("id", "") for s in retry_cases],
     }
 
     out_name = "retry_benefit_audit.fixed.json" if use_fixed else "retry_benefit_audit.json"
     out_path = run_dir / "artifacts" / out_name
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    # Stream straight into the file instead of building the whole JSON string first
+    save_json(report, out_path)
     print(f"Wrote {out_path}")
 
     # Console summary
@@ -21,7 +21,7 @@ from core import (  # type: ignore
     save_json,
     save_jsonl,
     load_json,
-    load_jsonl,
+    count_jsonl,
 )
 from datasets.domain_main.runner import run_smoke
 from datasets.domain_main.validate import validate_dataset
@@ -50,10 +50,10 @@ def validate_audit_artifacts(run_dir: Path) -> tuple[bool, list[str]]:
     manifest = load_json(manifest_path)
     n_total = (manifest.get("args") or {}).get("n_total")
     if n_total is not None:
-        per_sample = load_jsonl(per_sample_path)
-        if len(per_sample) != n_total:
+        n_per_sample = count_jsonl(per_sample_path)
+        if n_per_sample != n_total:
             errors.append(
-                f"per_sample count ({len(per_sample)}) != n_total ({n_total})"
+                f"per_sample count ({n_per_sample}) != n_total ({n_total})"
             )
     return (len(errors) == 0, errors)
 
@@ -101,7 +101,23 @@ def main() -> tuple[int, str]:
     save_jsonl(per_sample, per_sample_path)
 
     failures_path = artifacts_dir / "failures.csv"
-    with open(failures_path, "w", encoding="utf-8", newline="") as f:
+    failed_rows = [
+        (
+            r["qid"],
+            r["question"],
+            r["status"],
+            r["is_executable"],
+            r["http_status"],
+            r["error_type"],
+            r["em"],
+            r["f1"],
+            r["trace_path"],
+        )
+        for r in per_sample
+        if r["status"] != "ok"
+    ]
+    # Large buffer: rows are flushed in a few big writes rather than one per row
+    with open(failures_path, "w", encoding="utf-8", newline="", buffering=1 << 20) as f:
         writer = csv.writer(f)
         writer.writerow(
             [
@@ -116,22 +132,7 @@ def main() -> tuple[int, str]:
                 "trace_path",
             ]
         )
-        for r in per_sample:
-            if r["status"] == "ok":
-                continue
-            writer.writerow(
-                [
-                    r["qid"],
-                    r["question"],
-                    r["status"],
-                    r["is_executable"],
-                    r["http_status"],
-                    r["error_type"],
-                    r["em"],
-                    r["f1"],
-                    r["trace_path"],
-                ]
-            )
+        writer.writerows(failed_rows)
 
     end_time = datetime.now().isoformat()
     argv = list(sys.argv)
@@ -215,10 +216,9 @@ if __name__ == "__main__":
                     manifest["warnings"] = w
                     save_json(manifest, manifest_path)
             try:
-                import importlib.util
-                spec = importlib.util.spec_from_file_location("gen_run_report", ROOT / "scripts" / "gen_run_report.py")
-                gen_run_report = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(gen_run_report)
+                import importlib
+                # ROOT is on sys.path, so this goes through sys.modules / __pycache__
+                gen_run_report = importlib.import_module("scripts.gen_run_report")
                 out_path = gen_run_report.generate_report(run_id_for_report, TASK_NAME)
                 if run_log_path.exists():
                     with open(run_log_path, "a", encoding="utf-8") as f:
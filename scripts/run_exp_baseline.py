@@ -10,15 +10,28 @@ Features:
 from __future__ import annotations
 
 import argparse
+import functools
 import hashlib
+import heapq
+import importlib.util
 import json
 import os
+import re
 import sys
-from dataclasses import dataclass
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from types import MappingProxyType
 from typing import List, Dict, Any, Iterable, Tuple
 
+import numpy as np
+
+# httpx 的 HTTP/2 支持依赖可选包 h2
+HAS_H2 = importlib.util.find_spec("h2") is not None
+
 ROOT = Path(__file__).resolve().parent.parent
 CONFIGS_DIR = ROOT / "configs"
 DEFAULT_CONFIG_PATH = CONFIGS_DIR / "default_real_bm25_k10_evidence_guardrail_v2.yaml"
@@ -30,16 +43,24 @@ from framework.utils import (  # type: ignore
     resolve,
     ensure_dir,
     load_jsonl,
-    save_jsonl,
+    save_json,
     RUNS_DIR,
 )
-from framework.eval import (  # type: ignore
-    evaluate_prediction,
-    normalize_answer,
-    mixed_segmentation,
+from framework.eval import normalize_answer  # type: ignore
+# EM/F1 快速路径（与 framework.eval 逐值一致）；eval.py 为参照实现且受审计，不改动
+from framework.eval_fast import evaluate_prediction as _evaluate_prediction, segment_normalized  # type: ignore
+from framework.eval_fast import TOKENIZER_IMPL as _EVAL_TOKENIZER_IMPL, get_module_sha256 as _eval_fast_sha256  # type: ignore
+from framework.llm_cache import LLMCache  # type: ignore
+from framework.kg_index import (  # type: ignore
+    CACHE_DIR,
+    BM25Index,
+    LexicalIndex,
+    Triple,
+    TripleStore,
+    load_kg_with_indexes,
 )
-from core import set_seed, DualLogger, write_repro_manifest  # type: ignore
-from src.intent.intent_engine import IntentEngine  # type: ignore
+from core import set_seed, DualLogger, write_repro_manifest, JsonlWriter  # type: ignore
+from src.intent.intent_engine import IntentEngine, get_intent_engine  # type: ignore
 
 
 # Defaults suitable for remote DeepSeek API (can be overridden by env)
@@ -63,118 +84,157 @@ _API_KEY, _API_KEY_SOURCE = _resolve_api_key_and_source()
 DEFAULT_API_KEY = _API_KEY
 
 
-@dataclass
-class Triple:
-    subject: str
-    predicate: str
-    obj: str
+# 未显式传入索引时按 TripleStore 对象缓存（保存对象引用，避免 id 复用误命中）
+_INDEX_CACHE: Dict[Tuple[int, type], Tuple[TripleStore, Any]] = {}
 
 
-def _normalize_text(s: str | None) -> str:
-    return (s or "").strip()
+def _get_cached_index(triples: TripleStore, index_cls: type) -> Any:
+    key = (id(triples), index_cls)
+    hit = _INDEX_CACHE.get(key)
+    if hit is not None and hit[0] is triples and hit[1].n_docs == len(triples):
+        return hit[1]
+    index = index_cls.build(triples)
+    _INDEX_CACHE[key] = (triples, index)
+    return index
 
 
-def load_kg_triples(path: Path) -> List[Triple]:
-    rows = load_jsonl(path)
-    triples: List[Triple] = []
-    for r in rows:
-        s = _normalize_text(r.get("subject") or r.get("head"))
-        p = _normalize_text(r.get("predicate") or r.get("connect"))
-        o = _normalize_text(r.get("object") or r.get("tail"))
-        if not (s or p or o):
-            continue
-        triples.append(Triple(s, p, o))
-    return triples
+def _bm25_top_k(scores: np.ndarray, top_k: int) -> List[int]:
+    """按 (score, idx) 降序取前 top_k 个正分文档下标。"""
+    hits = np.flatnonzero(scores > 0)
+    if 0 < top_k < len(hits):
+        # O(D) 选出第 k 大分数作为阈值；保留阈值上的全部并列项，再做小规模排序
+        kth = np.partition(scores[hits], -top_k)[-top_k]
+        hits = hits[scores[hits] >= kth]
+    # 与 (score, idx) 降序排序一致：同分时 idx 大者在前
+    order = np.lexsort((hits, scores[hits]))[::-1]
+    return hits[order][:top_k].tolist()
 
 
 def retrieve_triples(
     question: str,
-    triples: List[Triple],
+    triples: TripleStore,
     top_k: int = 10,
     retriever_type: str = "simple",
+    bm25_index: BM25Index | None = None,
+    lexical_index: LexicalIndex | None = None,
 ) -> List[Triple]:
-    """Very simple lexical retriever with an optional BM25-like variant."""
+    """Very simple lexical retriever with an optional BM25-like variant.
+
+    bm25_index / lexical_index: 预构建索引（同一 KG 多次查询时传入以复用）；为 None 时按 triples 缓存构建。
+    """
     q = question
-    scored: List[Tuple[float, int]] = []  # (score, idx)
 
     if retriever_type == "bm25":
-        # Extremely simple BM25-ish scoring over concatenated triple text.
-        import math
-
-        docs: List[List[str]] = []
-        for t in triples:
-            text = f"{t.subject} {t.predicate} {t.obj}".strip()
-            tokens = text.split()
-            docs.append(tokens)
-
         # Query tokens
         q_tokens = q.split()
         if not q_tokens:
             return []
-
-        # Document frequencies for BM25-like idf
-        df = {}
-        for tokens in docs:
-            seen = set(tokens)
-            for tok in seen:
-                df[tok] = df.get(tok, 0) + 1
-        n_docs = len(docs)
-        idf = {tok: math.log((n_docs - c + 0.5) / (c + 0.5) + 1.0) for tok, c in df.items()}
-
-        k1 = 1.5
-        b = 0.75
-        avgdl = sum(len(d) for d in docs) / n_docs if n_docs else 0.0
-
-        for i, tokens in enumerate(docs):
-            score = 0.0
-            if not tokens:
-                continue
-            dl = len(tokens)
-            tf = {}
-            for tok in tokens:
-                tf[tok] = tf.get(tok, 0) + 1
-            for qt in q_tokens:
-                if qt not in tf or qt not in idf:
-                    continue
-                freq = tf[qt]
-                denom = freq + k1 * (1 - b + b * dl / avgdl) if avgdl > 0 else freq + k1
-                score += idf[qt] * (freq * (k1 + 1) / denom)
-            if score > 0:
-                scored.append((score, i))
-    else:
-        # simple lexical: subject/object substring match in question
-        for i, t in enumerate(triples):
-            score = 0.0
-            if t.subject and t.subject in q:
-                score += len(t.subject)
-            if t.obj and t.obj in q:
-                score += len(t.obj)
-            if score > 0:
-                scored.append((score, i))
-
-    scored.sort(reverse=True)
-    indices = [idx for _, idx in scored[:top_k]]
-    return [triples[i] for i in indices]
+        if bm25_index is None:
+            bm25_index = _get_cached_index(triples, BM25Index)
+        return triples.take(_bm25_top_k(bm25_index.score(q_tokens), top_k))
+
+    # simple lexical: subject/object substring match in question
+    if lexical_index is None:
+        lexical_index = _get_cached_index(triples, LexicalIndex)
+    scored = [(score, i) for i, score in lexical_index.score(q).items()]  # (score, idx)
+    # nlargest(n, it) 等价于 sorted(it, reverse=True)[:n]，但只维护大小为 k 的堆
+    top = heapq.nlargest(top_k, scored) if top_k > 0 else []
+    return triples.take(i for _, i in top)
+
+
+def retrieve_triples_batch(
+    questions: List[str],
+    triples: TripleStore,
+    top_ks: List[int],
+    retriever_types: List[str],
+    bm25_index: BM25Index | None = None,
+    lexical_index: LexicalIndex | None = None,
+) -> List[List[Triple]]:
+    """对一批问题逐条检索（各自的 top_k / retriever_type 可不同），结果与逐条调用 retrieve_triples 一致。
+
+    bm25 查询共用一个 n_docs 大小的分数缓冲区，不再每条问题重新分配。
+    """
+    scores_buf: np.ndarray | None = None
+    results: List[List[Triple]] = []
+    for q, top_k, retriever_type in zip(questions, top_ks, retriever_types):
+        if retriever_type != "bm25":
+            results.append(
+                retrieve_triples(q, triples, top_k=top_k, retriever_type=retriever_type, lexical_index=lexical_index)
+            )
+            continue
+        q_tokens = q.split()
+        if not q_tokens:
+            results.append([])
+            continue
+        if bm25_index is None:
+            bm25_index = _get_cached_index(triples, BM25Index)
+        if scores_buf is None:
+            scores_buf = np.empty(bm25_index.n_docs, dtype=np.float64)
+        results.append(triples.take(_bm25_top_k(bm25_index.score(q_tokens, out=scores_buf), top_k)))
+    return results
 
 
 PROMPT_CONTRACT_VERSION = "short_answer_v1"
 PROMPT_CONTRACT_VERSION_ANSWER_EVIDENCE = "short_answer_with_evidence_v1"
 PROMPT_CONTRACT_VERSION_GUARDRAIL = "short_answer_guardrail_answerable_only_v1"
 PROMPT_CONTRACT_VERSION_ANSWER_EVIDENCE_GUARDRAIL_V2 = "short_answer_with_evidence_guardrail_v2"
+_PROMPT_CONTRACT_VERSIONS: Dict[str, str] = {
+    "answer_only": PROMPT_CONTRACT_VERSION,
+    "answer_plus_evidence": PROMPT_CONTRACT_VERSION_ANSWER_EVIDENCE,
+    "guardrail_answerable_only": PROMPT_CONTRACT_VERSION_GUARDRAIL,
+    "answer_plus_evidence_guardrail_v2": PROMPT_CONTRACT_VERSION_ANSWER_EVIDENCE_GUARDRAIL_V2,
+}
+GUARDRAIL_VERSION_V2 = "evidence_bounded_v2"
+SUPPORT_SEMANTICS_VERSION_V2 = "raw_answer_only_v1"
+# metrics.audit 中只取决于 contract_variant 的字段：导入时按变体固化一次，main 里直接查表，
+# 避免各分支各自手写常量而产生漂移
+_AUDIT_CONST: Dict[str, MappingProxyType] = {
+    cv: MappingProxyType(
+        {
+            "eval_tokenizer": "mixed_zh_char_en_word_v1",
+            "eval_remove_en_articles": True,
+            "normalize_rules": "lower, remove_punc(en+cn), white_space_fix",
+            "prompt_contract_version": version,
+            "guardrail_version": GUARDRAIL_VERSION_V2 if cv == "answer_plus_evidence_guardrail_v2" else None,
+            "support_semantics_version": (
+                SUPPORT_SEMANTICS_VERSION_V2 if cv == "answer_plus_evidence_guardrail_v2" else None
+            ),
+        }
+    )
+    for cv, version in _PROMPT_CONTRACT_VERSIONS.items()
+}
 GENERATOR_PARSE_VERSION = "v1_content_or_text"
 RETRY_MAX = 3
+# 异常重试之间的指数退避：0.5s、1s……封顶 8s（空输出重试不等待）
+RETRY_BACKOFF_BASE_S = 0.5
+RETRY_BACKOFF_MAX_S = 8.0
 GEN_TEMPERATURE = 0.1
 GEN_TOP_P = 1.0
 GEN_MAX_TOKENS = 128
 GEN_SEED = 42
+GEN_CACHE_MAXSIZE = 4096
+_GEN_SAMPLING: Dict[str, Any] = {
+    "temperature": GEN_TEMPERATURE,
+    "top_p": GEN_TOP_P,
+    "max_tokens": GEN_MAX_TOKENS,
+    "seed": GEN_SEED,
+}
+GEN_CACHE_DB_PATH = CACHE_DIR / "llm_cache.db"
+
+# 进程内生成结果 LRU：blake2b(base_url, model, system, user) → (raw_text, attempts)，仅缓存成功输出。
+# GEN_TEMPERATURE > 0 时复用会改变采样行为，因此默认只在 temperature == 0 时启用（见 --gen_cache）
+_GEN_CACHE: "OrderedDict[bytes, tuple[str, int]]" = OrderedDict()
+_GEN_CACHE_LOCK = threading.Lock()
+# 正在请求中的 prompt：相同 key 的并发调用等待首个请求结束后再查 _GEN_CACHE，不重复请求
+_GEN_INFLIGHT: Dict[bytes, threading.Event] = {}
 
 
 def format_context_structured(triples: Iterable[Triple]) -> str:
     """结构化 triple 格式：每条单行，显式标注 subject/predicate/object。"""
-    lines = []
-    for t in triples:
-        lines.append(f"subject: {t.subject}\tpredicate: {t.predicate}\tobject: {t.obj}")
-    return "\n".join(lines) if lines else "(无检索结果)"
+    # 每行都非空，因此 join 结果为空串当且仅当无检索结果
+    return "\n".join(
+        f"subject: {t.subject}\tpredicate: {t.predicate}\tobject: {t.obj}" for t in triples
+    ) or "(无检索结果)"
 
 
 def format_context(triples: Iterable[Triple]) -> str:
@@ -183,42 +243,65 @@ def format_context(triples: Iterable[Triple]) -> str:
 
 def format_context_with_ids(triples: Iterable[Triple]) -> str:
     """在结构化 triple 基础上增加 1‑based 行号，便于模型引用 evidence 行。"""
-    lines = []
-    for idx, t in enumerate(triples, start=1):
-        lines.append(
-            f"[{idx}] subject: {t.subject}\tpredicate: {t.predicate}\tobject: {t.obj}"
-        )
-    return "\n".join(lines) if lines else "(无检索结果)"
+    return "\n".join(
+        f"[{idx}] subject: {t.subject}\tpredicate: {t.predicate}\tobject: {t.obj}"
+        for idx, t in enumerate(triples, start=1)
+    ) or "(无检索结果)"
 
 
 def _extract_content(resp: Any) -> tuple[str, str]:
-    """从 OpenAI 兼容返回中提取文本。返回 (text, status)。"""
+    """从 OpenAI 兼容返回中提取文本。返回 (text, status)。
+
+    按 v1 SDK 形状直接取 choices[0].message.content，缺失时回落到 choices[0].text。
+    """
     try:
-        if not resp.choices:
+        choices = resp.choices
+        if not choices:
             return "", "parse_fail"
-        c0 = resp.choices[0]
-        text = None
-        if hasattr(c0, "message") and c0.message:
-            text = getattr(c0.message, "content", None)
-        if (text is None or text == "") and hasattr(c0, "text"):
-            text = c0.text
+        c0 = choices[0]
+        try:
+            text = c0.message.content
+        except AttributeError:
+            text = None
+        if text is None or text == "":
+            text = getattr(c0, "text", None)
         out = (text or "").strip()
-        if not out:
-            return "", "empty"
-        return out, "success"
     except Exception:
         return "", "parse_fail"
+    if not out:
+        return "", "empty"
+    return out, "success"
+
+
+@functools.lru_cache(maxsize=4)
+def _get_client(base_url: str, api_key: str) -> Any:
+    """同一 (base_url, api_key) 复用一个 OpenAI 客户端，共享 httpx 连接池（keep-alive，线程安全）。
+
+    探活与全部生成请求共用该客户端；装有 h2 时启用 HTTP/2，并发请求复用同一条 TLS 连接多路传输。
+    max_retries=0：重试只由 generate_answer_local 的 RETRY_MAX 循环负责，attempts 即实际请求次数。
+    SDK 原本自动重试的情况（超时、连接中断、408 / 409 / 429、5xx）全部由 _classify_generation_error
+    判为可重试并按指数退避重试，关闭 SDK 重试不会丢掉任何一类。
+    """
+    import openai  # type: ignore
+
+    http_client_cls = getattr(openai, "DefaultHttpxClient", None)
+    if HAS_H2 and http_client_cls is not None:
+        # DefaultHttpxClient 保留 SDK 默认的超时 / 连接池设置，只额外打开 http2
+        return openai.OpenAI(
+            base_url=base_url, api_key=api_key, max_retries=0, http_client=http_client_cls(http2=True)
+        )
+    return openai.OpenAI(base_url=base_url, api_key=api_key, max_retries=0)
 
 
 def _probe_endpoint(base_url: str, model: str, api_key: str) -> tuple[bool, str]:
     """轻量探活：在正式运行前验证生成端是否可用。确保返回 non-empty content；失败则 fail-fast。"""
     try:
-        from openai import OpenAI  # type: ignore
+        import openai  # type: ignore  # noqa: F401
     except Exception as e:
         return False, f"导入 openai 失败: {e}"
 
     try:
-        client = OpenAI(base_url=base_url, api_key=api_key)
+        client = _get_client(base_url, api_key)
         resp = client.chat.completions.create(
             model=model,
             messages=[
@@ -228,152 +311,273 @@ def _probe_endpoint(base_url: str, model: str, api_key: str) -> tuple[bool, str]
             temperature=0.0,
             max_tokens=16,
         )
-        if not hasattr(resp, "choices") or not resp.choices:
+        _, status = _extract_content(resp)
+        if status == "parse_fail":
             return False, "probe 响应中缺少 choices"
-        c0 = resp.choices[0]
-        text = (getattr(c0.message, "content", None) if hasattr(c0, "message") and c0.message else None) or getattr(c0, "text", None)
-        if not (text and str(text).strip()):
+        if status == "empty":
             return False, "probe 返回 content 为空"
         return True, ""
     except Exception as e:  # pragma: no cover - 防御性代码
         return False, f"probe 请求失败: {e}"
 
 
-def generate_answer_local(
-    question: str,
-    context: str,
-    base_url: str,
-    model: str,
-    api_key: str,
-    mock: bool,
-    contract_variant: str,
-    use_retry_prompt: bool = False,
-) -> tuple[str, str, int, str]:
-    """返回 (raw_text, generator_status, attempts, last_error_message)。"""
-    if mock:
-        return "（Mock 模式：此答案仅用于测试流程连通性。）", "success", 1, ""
-
-    try:
-        from openai import OpenAI  # type: ignore
-    except Exception as e:
-        raise RuntimeError("导入 openai 失败，请先安装依赖：pip install openai") from e
-
-    client = OpenAI(base_url=base_url, api_key=api_key)
-
-    if contract_variant == "answer_plus_evidence":
-        system_prompt = (
+# (contract_variant, use_retry_prompt) → (system_prompt, user_prompt 模板)；
+# 模板内仅 {context} / {question} 两个占位符（context 在前，无转义花括号）
+_PROMPT_TEMPLATES: Dict[Tuple[str, bool], Tuple[str, str]] = {
+    ("answer_plus_evidence", False): (
+        (
             "你是一个知识库问答助手。输出契约：严格输出两行，且不要添加多余文本或解释。\n"
             "Line1: ANSWER: <最终答案或 UNKNOWN>\n"
             "Line2: EVIDENCE: <逗号分隔的行号，范围 1..K，对应给定 triples 的行号>\n"
             "不得输出额外前后缀、空行或说明文字。"
-        )
-        user_prompt = (
+        ),
+        (
             "[Triples]\n以下是检索到的三元组，每行带有方括号中的行号，可以在 EVIDENCE 中引用：\n"
-            f"{context}\n\n"
+            "{context}\n\n"
             "[Task]\n请仅根据上述 triples 回答下面的问题，并按严格格式输出两行：\n"
             "Line1 必须以 `ANSWER:` 开头，只填写最终答案或 UNKNOWN；不要解释。\n"
             "Line2 必须以 `EVIDENCE:` 开头，只填写逗号分隔的行号（1..K），表示支撑答案的 triples 行；"
             "若没有合适证据，可以留空但仍需保留该行。\n"
-            f"问题：{question}\n"
+            "问题：{question}\n"
             "现在输出："
-        )
-    elif contract_variant == "answer_plus_evidence_guardrail_v2":
-        if use_retry_prompt:
-            # Policy R retry prompt: 进一步强调 evidence 选择与 ANSWER 从 evidence 拷贝
-            system_prompt = (
-                "你是一个知识库问答助手。【重试】上次输出不符合要求。输出契约：严格输出两行。\n"
-                "Line1: ANSWER: <最终答案或 UNKNOWN>\n"
-                "Line2: EVIDENCE: <逗号分隔的行号，范围 1..K>\n"
-                "硬性约束：\n"
-                "1）你必须重新选择正确的 evidence 行号；\n"
-                "2）ANSWER 必须从 evidence 行中拷贝或轻微改写得到；否则必须输出 UNKNOWN；\n"
-                "3）禁止编造、禁止引入 EVIDENCE 行之外的内容；\n"
-                "4）严格两行，禁止多余文字。"
-            )
-            user_prompt = (
-                "[Triples]\n以下是检索到的三元组，每行带有方括号中的行号：\n"
-                f"{context}\n\n"
-                "[Task - 重试]\n请重新选择正确的 evidence 行号；"
-                "ANSWER 必须从这些 evidence 行中拷贝或轻微改写；否则输出 UNKNOWN。严格两行。\n"
-                f"问题：{question}\n"
-                "现在输出："
-            )
-        else:
-            system_prompt = (
-                "你是一个知识库问答助手。输出契约：严格输出两行，且不要添加多余文本或解释。\n"
-                "Line1: ANSWER: <最终答案或 UNKNOWN>\n"
-                "Line2: EVIDENCE: <逗号分隔的行号，范围 1..K，对应给定 triples 的行号>\n"
-                "硬性约束：\n"
-                "1）你必须先从给定 triples 中选择若干行号作为 EVIDENCE；\n"
-                "2）ANSWER 只能从这些 EVIDENCE 行中的 subject/object/数值/术语拷贝或轻微改写得到，"
-                "不得引入不在 EVIDENCE 行里的新事实；\n"
-                "3）如果在任何 EVIDENCE 行中都找不到能支撑答案的内容（包括同义表达），必须输出 UNKNOWN；\n"
-                "4）禁止使用给定 triples 之外的常识或背景知识进行补全；\n"
-                "5）禁止解释、禁止多行，只能严格输出上述两行。"
-            )
-            user_prompt = (
-                "[Triples]\n以下是检索到的三元组，每行带有方括号中的行号，可以在 EVIDENCE 中引用：\n"
-                f"{context}\n\n"
-                "[Task]\n请按如下步骤严格操作：\n"
-                "1）先在上述 triples 中选择若干最相关的行号，作为支撑答案的 EVIDENCE；\n"
-                "2）仅允许从这些 EVIDENCE 行中的 subject/object/数值/术语进行拷贝或轻微改写来构造答案；\n"
-                "3）如果在这些 EVIDENCE 中找不到可以支撑答案的内容，必须输出 UNKNOWN；\n"
-                "4）禁止使用 triples 之外的常识或背景知识。\n\n"
-                "输出格式必须严格为两行：\n"
-                "Line1: ANSWER: <最终答案或 UNKNOWN>\n"
-                "Line2: EVIDENCE: <逗号分隔的行号>\n"
-                "不得输出多余文字、标点或空行。\n"
-                f"问题：{question}\n"
-                "现在输出："
-            )
-    elif contract_variant == "guardrail_answerable_only":
-        system_prompt = (
+        ),
+    ),
+    # Policy R retry prompt: 进一步强调 evidence 选择与 ANSWER 从 evidence 拷贝
+    ("answer_plus_evidence_guardrail_v2", True): (
+        (
+            "你是一个知识库问答助手。【重试】上次输出不符合要求。输出契约：严格输出两行。\n"
+            "Line1: ANSWER: <最终答案或 UNKNOWN>\n"
+            "Line2: EVIDENCE: <逗号分隔的行号，范围 1..K>\n"
+            "硬性约束：\n"
+            "1）你必须重新选择正确的 evidence 行号；\n"
+            "2）ANSWER 必须从 evidence 行中拷贝或轻微改写得到；否则必须输出 UNKNOWN；\n"
+            "3）禁止编造、禁止引入 EVIDENCE 行之外的内容；\n"
+            "4）严格两行，禁止多余文字。"
+        ),
+        (
+            "[Triples]\n以下是检索到的三元组，每行带有方括号中的行号：\n"
+            "{context}\n\n"
+            "[Task - 重试]\n请重新选择正确的 evidence 行号；"
+            "ANSWER 必须从这些 evidence 行中拷贝或轻微改写；否则输出 UNKNOWN。严格两行。\n"
+            "问题：{question}\n"
+            "现在输出："
+        ),
+    ),
+    ("answer_plus_evidence_guardrail_v2", False): (
+        (
+            "你是一个知识库问答助手。输出契约：严格输出两行，且不要添加多余文本或解释。\n"
+            "Line1: ANSWER: <最终答案或 UNKNOWN>\n"
+            "Line2: EVIDENCE: <逗号分隔的行号，范围 1..K，对应给定 triples 的行号>\n"
+            "硬性约束：\n"
+            "1）你必须先从给定 triples 中选择若干行号作为 EVIDENCE；\n"
+            "2）ANSWER 只能从这些 EVIDENCE 行中的 subject/object/数值/术语拷贝或轻微改写得到，"
+            "不得引入不在 EVIDENCE 行里的新事实；\n"
+            "3）如果在任何 EVIDENCE 行中都找不到能支撑答案的内容（包括同义表达），必须输出 UNKNOWN；\n"
+            "4）禁止使用给定 triples 之外的常识或背景知识进行补全；\n"
+            "5）禁止解释、禁止多行，只能严格输出上述两行。"
+        ),
+        (
+            "[Triples]\n以下是检索到的三元组，每行带有方括号中的行号，可以在 EVIDENCE 中引用：\n"
+            "{context}\n\n"
+            "[Task]\n请按如下步骤严格操作：\n"
+            "1）先在上述 triples 中选择若干最相关的行号，作为支撑答案的 EVIDENCE；\n"
+            "2）仅允许从这些 EVIDENCE 行中的 subject/object/数值/术语进行拷贝或轻微改写来构造答案；\n"
+            "3）如果在这些 EVIDENCE 中找不到可以支撑答案的内容，必须输出 UNKNOWN；\n"
+            "4）禁止使用 triples 之外的常识或背景知识。\n\n"
+            "输出格式必须严格为两行：\n"
+            "Line1: ANSWER: <最终答案或 UNKNOWN>\n"
+            "Line2: EVIDENCE: <逗号分隔的行号>\n"
+            "不得输出多余文字、标点或空行。\n"
+            "问题：{question}\n"
+            "现在输出："
+        ),
+    ),
+    ("guardrail_answerable_only", False): (
+        (
             "你是一个知识库问答助手。硬性约束：只能从给定 triples 中提取答案，"
             "绝对禁止编造、不在 triples 中出现的事实。\n"
             "若在 triples 中找不到足够信息，请输出 UNKNOWN。输出契约：只输出最终答案或 UNKNOWN，不要解释。"
-        )
-        user_prompt = (
+        ),
+        (
             "[Triples]\n以下是检索到的三元组（每行格式：subject / predicate / object）：\n"
-            f"{context}\n\n"
+            "{context}\n\n"
             "[Task]\n请仅根据上述 triples 回答下面的问题。\n"
             "如果你无法在 triples 中找到足够的信息来确定答案，必须输出 UNKNOWN，"
             "不得根据常识或背景知识猜测。\n"
             "输出契约：只输出一个简洁的最终答案或 UNKNOWN，不要解释。\n"
-            f"问题：{question}\n"
+            "问题：{question}\n"
             "答案："
-        )
-    else:
-        # 默认：原始 short_answer_v1 合同，仅输出最终答案或 UNKNOWN
-        system_prompt = (
+        ),
+    ),
+    # 默认：原始 short_answer_v1 合同，仅输出最终答案或 UNKNOWN
+    ("answer_only", False): (
+        (
             "你是一个知识库问答助手。输出契约：只输出最终答案，不要解释。"
             "若无法从给定的 triples 得到答案，请输出 UNKNOWN。"
-        )
-        user_prompt = (
+        ),
+        (
             "[Triples]\n以下是检索到的三元组（每行格式：subject / predicate / object）：\n"
-            f"{context}\n\n"
+            "{context}\n\n"
             "[Task]\n请仅根据上述 triples 回答下面的问题。只输出最终答案，不要解释。"
             "若 triples 中无法得到答案，输出 UNKNOWN。\n"
-            f"问题：{question}\n"
+            "问题：{question}\n"
             "答案："
+        ),
+    ),
+}
+
+
+def _split_user_template(tpl: str) -> Tuple[str, str, str]:
+    head, rest = tpl.split("{context}", 1)
+    mid, tail = rest.split("{question}", 1)
+    return head, mid, tail
+
+
+# 用户模板按占位符预切为 (head, mid, tail)，填充时一次 join 出最终 prompt，不经 format_map 的中间拷贝
+_PROMPT_PARTS: Dict[Tuple[str, bool], Tuple[str, Tuple[str, str, str]]] = {
+    key: (system_prompt, _split_user_template(user_tpl))
+    for key, (system_prompt, user_tpl) in _PROMPT_TEMPLATES.items()
+}
+
+
+def _build_prompts(contract_variant: str, use_retry_prompt: bool, context: str, question: str) -> tuple[str, str]:
+    """按合同变体取模板并填充 context / question；未知变体回落到默认 short_answer_v1。"""
+    key = (contract_variant, use_retry_prompt)
+    if key not in _PROMPT_PARTS:
+        key = (contract_variant, False) if (contract_variant, False) in _PROMPT_PARTS else ("answer_only", False)
+    system_prompt, (head, mid, tail) = _PROMPT_PARTS[key]
+    return system_prompt, "".join((head, context, mid, question, tail))
+
+
+def _render_prompt_template_used(contract_variant: str) -> str:
+    """prompt_template_used.txt 内容：直接取自实际发送的模板表（含 Policy R 重试模板），不另维护一份文案。"""
+    if (contract_variant, False) not in _PROMPT_TEMPLATES:
+        contract_variant = "answer_only"
+    parts: List[str] = []
+    for use_retry_prompt in (False, True):
+        key = (contract_variant, use_retry_prompt)
+        if key not in _PROMPT_TEMPLATES:
+            continue
+        system_prompt, user_tpl = _PROMPT_TEMPLATES[key]
+        suffix = " (retry)" if use_retry_prompt else ""
+        parts.append(f"=== System{suffix} ===\n{system_prompt}\n\n=== User{suffix} ===\n{user_tpl}\n")
+    audit_const = _AUDIT_CONST[contract_variant]
+    footer = f"prompt_contract_version={audit_const['prompt_contract_version']}"
+    if audit_const["guardrail_version"] is not None:
+        footer += f", guardrail_version={audit_const['guardrail_version']}"
+    return "\n".join(parts) + "\n" + footer
+
+
+def generate_answer_local(
+    question: str,
+    context: str,
+    base_url: str,
+    model: str,
+    api_key: str,
+    mock: bool,
+    contract_variant: str,
+    use_retry_prompt: bool = False,
+    client: Any = None,
+    use_cache: bool = False,
+    response_cache: LLMCache | None = None,
+) -> tuple[str, str, int, str]:
+    """返回 (raw_text, generator_status, attempts, last_error_message)。
+
+    attempts 为本次调用实际发出的请求数：命中进程内 / 持久缓存时为 0（status 仍为 "success"）。
+    client: 复用的 OpenAI 客户端；为 None 时按 (base_url, api_key) 取缓存客户端。
+    use_cache: 同一进程内相同 (base_url, model, prompt) 直接复用此前成功的输出，不再请求生成端；
+        并发的相同 prompt 只发一次请求。
+    response_cache: 可选的跨运行持久缓存（精确匹配 base_url/model/contract/messages/采样参数），进程内未命中时再查。
+    """
+    if mock:
+        return "（Mock 模式：此答案仅用于测试流程连通性。）", "success", 1, ""
+
+    if client is None:
+        try:
+            client = _get_client(base_url, api_key)
+        except ImportError as e:
+            raise RuntimeError("导入 openai 失败，请先安装依赖：pip install openai") from e
+
+    system_prompt, user_prompt = _build_prompts(contract_variant, use_retry_prompt, context, question)
+
+    cache_key = b""
+    inflight: threading.Event | None = None
+    if use_cache:
+        cache_key = hashlib.blake2b(
+            "\x1f".join((base_url, model, system_prompt, user_prompt)).encode("utf-8"),
+            digest_size=16,
+        ).digest()
+        while True:
+            with _GEN_CACHE_LOCK:
+                hit = _GEN_CACHE.get(cache_key)
+                if hit is not None:
+                    _GEN_CACHE.move_to_end(cache_key)
+                    break
+                pending = _GEN_INFLIGHT.get(cache_key)
+                if pending is None:
+                    inflight = _GEN_INFLIGHT[cache_key] = threading.Event()
+                    break
+            # 相同 prompt 已在请求中：等它结束后重查缓存；对方失败时由本线程接手请求
+            pending.wait()
+        if hit is not None:
+            return hit[0], "success", 0, ""
+
+    try:
+        return _generate_uncached(
+            client, base_url, model, contract_variant, system_prompt, user_prompt, cache_key, response_cache
         )
+    finally:
+        if inflight is not None:
+            with _GEN_CACHE_LOCK:
+                _GEN_INFLIGHT.pop(cache_key, None)
+            inflight.set()
+
+
+def _gen_cache_put(cache_key: bytes, value: tuple[str, int]) -> None:
+    with _GEN_CACHE_LOCK:
+        _GEN_CACHE[cache_key] = value
+        if len(_GEN_CACHE) > GEN_CACHE_MAXSIZE:
+            _GEN_CACHE.popitem(last=False)
+
+
+def _generate_uncached(
+    client: Any,
+    base_url: str,
+    model: str,
+    contract_variant: str,
+    system_prompt: str,
+    user_prompt: str,
+    cache_key: bytes,
+    response_cache: LLMCache | None,
+) -> tuple[str, str, int, str]:
+    """generate_answer_local 进程内缓存未命中时的路径：持久缓存 → 带重试的实际请求。
+
+    cache_key 非空时把成功输出写回进程内缓存。
+    """
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+    persist_key = ""
+    if response_cache is not None:
+        persist_key = LLMCache.make_key(base_url, model, contract_variant, messages, _GEN_SAMPLING)
+        hit = response_cache.get(persist_key)
+        if hit is not None:
+            if cache_key:
+                _gen_cache_put(cache_key, hit)
+            return hit[0], "success", 0, ""
 
     last_err = ""
     fail_reason = "empty"
     for attempt in range(1, RETRY_MAX + 1):
         try:
-            resp = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                temperature=GEN_TEMPERATURE,
-                top_p=GEN_TOP_P,
-                max_tokens=GEN_MAX_TOKENS,
-                seed=GEN_SEED,
-            )
+            resp = client.chat.completions.create(model=model, messages=messages, **_GEN_SAMPLING)
             text, status = _extract_content(resp)
             if status == "success":
+                if response_cache is not None:
+                    response_cache.set(persist_key, text, attempt)
+                if cache_key:
+                    _gen_cache_put(cache_key, (text, attempt))
                 return text, "success", attempt, ""
             if status == "empty":
                 last_err = "empty_output"
@@ -384,22 +588,209 @@ def generate_answer_local(
         except Exception as e:
             msg = str(e)
             last_err = msg[:200]
-            if "Connection refused" in msg or "Failed to establish" in msg:
+            if _is_connection_refused(e):
                 raise RuntimeError(
                     f"无法连接到本地模型服务（base_url={base_url}）。"
                     "请确认 Ollama/vLLM 是否已启动。"
                 ) from e
-            if "timeout" in msg.lower() or "timed out" in msg.lower():
-                fail_reason = "timeout"
-                continue
-            if "5" in msg or "500" in msg or "502" in msg or "503" in msg:
-                fail_reason = "http_fail"
-                continue
-            raise
+            reason = _classify_generation_error(e)
+            if reason is None:
+                if _http_status_code(e) is not None:
+                    # 不可重试的 4xx（鉴权、参数错误等）：记为本样本 http_fail，不中断整个运行
+                    return "", "http_fail", attempt, last_err
+                raise RuntimeError(f"生成端请求失败（不可重试）：{last_err}") from e
+            fail_reason = reason
+            if attempt < RETRY_MAX:
+                time.sleep(min(RETRY_BACKOFF_BASE_S * 2 ** (attempt - 1), RETRY_BACKOFF_MAX_S))
 
     return "", fail_reason, RETRY_MAX, last_err or "max_retries"
 
 
+# 与 openai SDK 自身的重试判定一致：请求超时 / 冲突 / 限流，以及全部 5xx
+_RETRYABLE_HTTP_STATUS = frozenset({408, 409, 429})
+
+
+def _http_status_code(e: Exception) -> int | None:
+    """openai SDK 的 HTTP 状态异常返回其状态码，其他异常返回 None。"""
+    try:
+        import openai  # type: ignore
+    except ImportError:
+        return None
+    return e.status_code if isinstance(e, openai.APIStatusError) else None
+
+
+def _is_connection_refused(e: Exception) -> bool:
+    """服务未启动（连接被拒绝 / 无法建立连接）：重试无意义，直接中断运行。
+
+    openai SDK 把底层 httpx 异常包装为 APIConnectionError("Connection error.")，原因在 __cause__ 上。
+    """
+    for err in (e, e.__cause__):
+        if err is None:
+            continue
+        if isinstance(err, ConnectionRefusedError):
+            return True
+        msg = str(err)
+        if "Connection refused" in msg or "Failed to establish" in msg:
+            return True
+    return False
+
+
+def _classify_generation_error(e: Exception) -> str | None:
+    """生成端异常 → 可重试的失败原因（"timeout" / "http_fail" / "connection_fail"）；不可重试时返回 None。
+
+    只按异常类型与 HTTP 状态码判断，不匹配报错文本（client 为 max_retries=0，这些情况全部由调用方的退避重试负责）：
+    - 超时（openai.APITimeoutError / TimeoutError）→ "timeout"
+    - 408 / 409 / 429 与 5xx → "http_fail"；其余 4xx 不重试
+    - 连接中断 / 重置（openai.APIConnectionError / ConnectionError / OSError）→ "connection_fail"
+    """
+    try:
+        import openai  # type: ignore
+    except ImportError:
+        openai = None
+    if openai is not None:
+        # APITimeoutError 是 APIConnectionError 的子类，须先判断
+        if isinstance(e, openai.APITimeoutError):
+            return "timeout"
+        if isinstance(e, openai.APIStatusError):
+            status = e.status_code
+            return "http_fail" if status in _RETRYABLE_HTTP_STATUS or status >= 500 else None
+        if isinstance(e, openai.APIConnectionError):
+            return "connection_fail"
+    if isinstance(e, TimeoutError):
+        return "timeout"
+    if isinstance(e, OSError):
+        return "connection_fail"
+    return None
+
+
+def _format_context_for_variant(contract_variant: str, retrieved: List[Triple]) -> str:
+    """evidence 类契约需要带行号的上下文，其余变体用普通上下文。"""
+    if contract_variant in ("answer_plus_evidence", "answer_plus_evidence_guardrail_v2"):
+        return format_context_with_ids(retrieved)
+    return format_context(retrieved)
+
+
+BATCH_API_TERMINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+BATCH_API_POLL_INITIAL_S = 10.0
+BATCH_API_POLL_MAX_S = 300.0
+
+
+def generate_answers_via_batch_api(
+    prompts: List[Tuple[str, str]],
+    model: str,
+    client: Any,
+    batch_input_path: Path,
+    log_fn=print,
+    response_cache: LLMCache | None = None,
+    contract_variant: str = "",
+    base_url: str = "",
+) -> Tuple[List[tuple[str, str, int, str] | None], Dict[str, Any]]:
+    """用 OpenAI Batch API 一次性提交首轮生成请求（面向不在意时延的消融 sweep）。
+
+    prompts: 与样本一一对应的 (system_prompt, user_prompt)；完全相同的 prompt 只提交一次。
+    返回 (outputs, stats)：outputs 与 prompts 对齐，成功项为与 generate_answer_local 相同形状的
+    (raw_text, "success", 1, "")，失败/缺失项为 None，由调用方回落到逐条实时请求。
+    端点不支持 Batch API、批任务失败或过期时全部为 None，不中断本次运行。
+    response_cache / contract_variant / base_url: 成功输出按与实时请求相同的键写入持久缓存。
+    """
+    outputs: List[tuple[str, str, int, str] | None] = [None] * len(prompts)
+    stats: Dict[str, Any] = {"batch_id": None, "status": None, "n_requests": 0, "n_filled": 0}
+    if not prompts:
+        return outputs, stats
+
+    # 相同 prompt 合并为一个 custom_id，回填时分发给全部对应样本
+    slots: Dict[Tuple[str, str], List[int]] = {}
+    for i, prompt in enumerate(prompts):
+        slots.setdefault(prompt, []).append(i)
+    custom_ids: Dict[str, Tuple[str, str]] = {}
+    ensure_dir(batch_input_path.parent)
+    with JsonlWriter(batch_input_path) as w:
+        for n, (system_prompt, user_prompt) in enumerate(slots):
+            custom_id = f"req-{n}"
+            custom_ids[custom_id] = (system_prompt, user_prompt)
+            w.write(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        "model": model,
+                        "messages": [
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt},
+                        ],
+                        **_GEN_SAMPLING,
+                    },
+                }
+            )
+    stats["n_requests"] = len(custom_ids)
+
+    try:
+        from openai.types.chat import ChatCompletion  # type: ignore
+
+        with open(batch_input_path, "rb") as f:
+            input_file = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        stats["batch_id"] = batch.id
+        log_fn(f"[BATCH] submitted batch_id={batch.id} requests={len(custom_ids)}")
+        delay = BATCH_API_POLL_INITIAL_S
+        while batch.status not in BATCH_API_TERMINAL_STATUSES:
+            time.sleep(delay)
+            delay = min(delay * 2, BATCH_API_POLL_MAX_S)
+            batch = client.batches.retrieve(batch.id)
+        stats["status"] = batch.status
+        if batch.status != "completed" or not batch.output_file_id:
+            log_fn(f"[BATCH] batch_id={batch.id} status={batch.status}; falling back to live requests")
+            return outputs, stats
+        content = client.files.content(batch.output_file_id).text
+    except Exception as e:
+        stats["status"] = f"error: {str(e)[:200]}"
+        log_fn(f"[BATCH] unavailable ({str(e)[:200]}); falling back to live requests")
+        return outputs, stats
+
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            prompt = custom_ids[record["custom_id"]]
+            response = record.get("response") or {}
+            if response.get("status_code") != 200:
+                continue
+            # 与实时请求走同一套提取逻辑（GENERATOR_PARSE_VERSION 不变）
+            text, status = _extract_content(ChatCompletion.model_validate(response["body"]))
+        except Exception:
+            continue
+        if status != "success":
+            continue
+        if response_cache is not None:
+            system_prompt, user_prompt = prompt
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ]
+            response_cache.set(
+                LLMCache.make_key(base_url, model, contract_variant, messages, _GEN_SAMPLING), text, 1
+            )
+        for i in slots[prompt]:
+            outputs[i] = (text, "success", 1, "")
+            stats["n_filled"] += 1
+    log_fn(f"[BATCH] batch_id={stats['batch_id']} filled {stats['n_filled']}/{len(prompts)} samples")
+    return outputs, stats
+
+
+# ANSWER/EVIDENCE 行：等价于“strip 后的行以该前缀开头（不区分大小写）”，取首个匹配行
+_ANSWER_LINE_RE = re.compile(r"^[^\S\n]*ANSWER:(.*)$", re.IGNORECASE | re.MULTILINE)
+_EVIDENCE_LINE_RE = re.compile(r"^[^\S\n]*EVIDENCE:(.*)$", re.IGNORECASE | re.MULTILINE)
+# str.splitlines 会切分、但 "^"/"$" 不识别的换行符；出现时先规范化为 "\n"
+_OTHER_LINEBREAK_RE = re.compile("[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+_CJK_COMMA = str.maketrans({"，": ","})
+
+
 def _parse_answer_and_evidence(
     raw_text: str,
     retrieved_k: int,
@@ -421,49 +812,83 @@ def _parse_answer_and_evidence(
         meta["evidence_empty"] = True
         return "", [], meta
 
-    lines = [ln.strip() for ln in raw_text.splitlines() if ln.strip()]
-    answer = raw_text.strip()
-    evidence_ids: list[int] = []
+    text = raw_text
+    if _OTHER_LINEBREAK_RE.search(text):
+        text = "\n".join(text.splitlines())
 
     # 解析 ANSWER 行
-    for ln in lines:
-        if ln.upper().startswith("ANSWER:"):
-            answer = ln[len("ANSWER:") :].strip()
-            break
+    m = _ANSWER_LINE_RE.search(text)
+    answer = m.group(1).strip() if m else raw_text.strip()
+    evidence_ids: list[int] = []
 
     # 解析 EVIDENCE 行
-    for ln in lines:
-        if ln.upper().startswith("EVIDENCE:"):
-            meta["has_evidence_line"] = True
-            payload = ln[len("EVIDENCE:") :].strip()
-            if not payload:
-                meta["evidence_empty"] = True
-                break
-            raw_tokens = [t.strip() for t in payload.replace("，", ",").split(",") if t.strip()]
+    m = _EVIDENCE_LINE_RE.search(text)
+    if m is not None:
+        meta["has_evidence_line"] = True
+        payload = m.group(1).strip()
+        if not payload:
+            meta["evidence_empty"] = True
+        else:
             seen_raw: list[int] = []
-            for tok in raw_tokens:
-                try:
-                    idx = int(tok)
-                except ValueError:
-                    # 忽略非整数 token
-                    continue
-                seen_raw.append(idx)
-                if idx < 1 or idx > max(retrieved_k, 0):
-                    meta["evidence_out_of_range"] = True
-                    continue
-                evidence_ids.append(idx)
-            if len(seen_raw) != len(set(seen_raw)):
-                meta["evidence_has_duplicate"] = True
-            break
-
-    # 去重并排序合法的 evidence id
-    evidence_ids = sorted(set(evidence_ids))
+            for tok in payload.translate(_CJK_COMMA).split(","):
+                tok = tok.strip()
+                if tok.isdecimal():
+                    seen_raw.append(int(tok))
+                elif tok:
+                    try:
+                        seen_raw.append(int(tok))
+                    except ValueError:
+                        # 忽略非整数 token
+                        pass
+            k = max(retrieved_k, 0)
+            uniq = set(seen_raw)
+            # 去重并排序合法的 evidence id
+            evidence_ids = sorted(x for x in uniq if 1 <= x <= k)
+            meta["evidence_out_of_range"] = len(evidence_ids) != len(uniq)
+            meta["evidence_has_duplicate"] = len(seen_raw) != len(uniq)
+
     return answer, evidence_ids, meta
 
 
+@functools.lru_cache(maxsize=1)
+def _support_module_sha256() -> str:
+    """framework.evidence_support 的模块指纹，每进程只算一次。
+
+    该模块本身的 sha256 记入 metrics.audit，不能为加缓存去改它，因此在调用处记忆化。
+    """
+    from framework.evidence_support import get_module_sha256  # type: ignore
+
+    return get_module_sha256()
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return -1
+
+
+@functools.lru_cache(maxsize=8)
+def _file_sha256(path: str, mtime_ns: int) -> str:
+    """按 (路径, mtime) 缓存的文件 sha256；同一进程内多次 main() 只读一次文件。"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
 def _load_default_config_and_fingerprint() -> tuple[dict | None, str]:
-    """Load default config and return (config_dict, fingerprint_sha256)."""
-    if not DEFAULT_CONFIG_PATH.exists():
+    """Load default config and return (config_dict, fingerprint_sha256).
+
+    Cached per config mtime; the returned dict is shared and must not be mutated.
+    """
+    return _load_config_and_fingerprint_cached(_mtime_ns(DEFAULT_CONFIG_PATH))
+
+
+@functools.lru_cache(maxsize=1)
+def _load_config_and_fingerprint_cached(mtime_ns: int) -> tuple[dict | None, str]:
+    if mtime_ns < 0:
         return None, ""
     try:
         import yaml  # type: ignore
@@ -473,22 +898,36 @@ def _load_default_config_and_fingerprint() -> tuple[dict | None, str]:
         return None, ""
     if cfg is None:
         cfg = {}
+    # 指纹须与 scripts/compute_config_fingerprint.py 及历史 metrics.audit.config_fingerprint 一致：
+    # 固定为 stdlib json 规范化 + sha256（orjson 的浮点格式如 1e-5 与 json 的 1e-05 不同，换算法会使指纹失配）
     canonical = json.dumps(cfg, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
     fp = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
     return cfg, fp
 
 
-def _quantile(values: list[float], q: float) -> float:
-    if not values:
+def _quantile(values: list[float] | np.ndarray, q: float) -> float:
+    """下取整位置的分位数（与“排序后取 s[int((n-1)*q)]”一致），np.partition 为 O(n) 选择。"""
+    n = len(values)
+    if not n:
         return 0.0
-    s = sorted(values)
-    i = int((len(s) - 1) * q)
-    return s[min(i, len(s) - 1)]
+    i = min(int((n - 1) * q), n - 1)
+    return float(np.partition(np.asarray(values, dtype=np.float64), i)[i])
 
 
 EVIDENCE_KEY_TOKENS_K = 5
 
 
+# 同一答案 / evidence 上下文在初始判定、Policy R 重试与运行末汇总中会被反复归一化，按内容缓存
+@functools.lru_cache(maxsize=1 << 16)
+def _answer_key_tokens(answer: str) -> tuple[str, ...]:
+    return tuple(segment_normalized(normalize_answer(answer))[:EVIDENCE_KEY_TOKENS_K])
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def _normalize_context(ctx: str) -> str:
+    return normalize_answer(ctx)
+
+
 def _compute_single_evidence_support(
     answer: str,
     evidence_ids: list[int],
@@ -503,30 +942,29 @@ def _compute_single_evidence_support(
     if not answer or not retrieved:
         return None
 
-    norm_answer = normalize_answer(answer)
-    ans_tokens = mixed_segmentation(norm_answer)
-    key_tokens = ans_tokens[:EVIDENCE_KEY_TOKENS_K]
+    key_tokens = _answer_key_tokens(answer)
     if not key_tokens:
         return None
 
-    ctx_parts: list[str] = []
-    for idx in evidence_ids:
-        j = idx - 1
-        if 0 <= j < len(retrieved):
-            t = retrieved[j]
-            ctx_parts.append(
-                f"{t.get('subject','')} {t.get('predicate','')} {t.get('object','')}"
-            )
+    # key_tokens 为空时已提前返回，只有可计算的样本才拼接并归一化 evidence 上下文
+    n_retrieved = len(retrieved)
+    ctx_parts = [
+        f"{t.get('subject','')} {t.get('predicate','')} {t.get('object','')}"
+        for t in (retrieved[idx - 1] for idx in evidence_ids if 1 <= idx <= n_retrieved)
+    ]
     if not ctx_parts:
         return None
 
-    norm_ctx = normalize_answer(" ".join(ctx_parts))
+    norm_ctx = _normalize_context(" ".join(ctx_parts))
     if not norm_ctx:
         return None
 
     # raw_answer_only_v1: 子串匹配，key token 需作为子串出现在 ctx 中
-    covered = [t for t in key_tokens if t and t in norm_ctx]
-    return len(covered) / len(key_tokens)
+    covered = 0
+    for t in key_tokens:
+        if t and t in norm_ctx:
+            covered += 1
+    return covered / len(key_tokens)
 
 
 def _compute_evidence_support_summary(samples: list[dict]) -> Dict[str, Any]:
@@ -556,9 +994,11 @@ def _compute_evidence_support_summary(samples: list[dict]) -> Dict[str, Any]:
             "failure_case_ids": [],
         }
 
+    cov_arr = np.asarray(coverages, dtype=np.float64)
+    # 均值保持顺序求和（np.mean 为 pairwise 求和，末位可能与历史报告不一致）
     mean_cov = sum(coverages) / n
-    med_cov = _quantile(coverages, 0.5)
-    support_rate = sum(1 for c in coverages if c >= 0.5) / n
+    med_cov = _quantile(cov_arr, 0.5)
+    support_rate = int(np.count_nonzero(cov_arr >= 0.5)) / n
     return {
         "n": n,
         "key_tokens_k": EVIDENCE_KEY_TOKENS_K,
@@ -569,23 +1009,56 @@ def _compute_evidence_support_summary(samples: list[dict]) -> Dict[str, Any]:
     }
 
 
+_JSON_ENCODE = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def _generator_status_line(s: Dict[str, Any]) -> str:
+    """per_sample_generator_status.jsonl 的一行；与 json.dumps({"id", "generator_status", "attempts"}) 逐字节一致，但不构造中间 dict。"""
+    return (
+        f'{{"id": {_JSON_ENCODE(s.get("id"))}, '
+        f'"generator_status": {_JSON_ENCODE(s.get("generator_status", ""))}, '
+        f'"attempts": {_JSON_ENCODE(s.get("attempts", 1))}}}\n'
+    )
+
+
 def run_experiment(
     args: argparse.Namespace,
     log_fn: Any = None,
+    row_sink: Any = None,
+    artifacts_dir: Path | None = None,
 ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
-    """log_fn: optional callback for enforce logs, e.g. logger.log."""
-    _log = log_fn if callable(log_fn) else (lambda _: None)
+    """log_fn: optional callback for enforce logs, e.g. logger.log.
+
+    row_sink: optional callback receiving each per-sample row in sample order as soon as it is ready
+    (e.g. to stream per_sample_results.jsonl while later samples are still generating).
+    artifacts_dir: where --use_batch_api writes batch_input.jsonl (defaults to runs/.cache).
+    """
+    # _run_sample 在生成线程池中调用 _log：对任意 log_fn（不只 DualLogger）串行化，保证每行完整、不交错
+    _log_lock = threading.Lock()
+
+    def _log(msg: str) -> None:
+        if callable(log_fn):
+            with _log_lock:
+                log_fn(msg)
+
     test_path = resolve(args.test_data)
     kg_path = resolve(args.kg_data)
 
     test_samples = load_jsonl(test_path)
-    triples = load_kg_triples(kg_path)
+    # BM25 语料统计只依赖 KG，构建一次供所有样本复用（路由模式可能切换到 bm25）
+    need_bm25 = args.retriever_type == "bm25" or getattr(args, "intent_mode", "none") in ("rule_v1_route", "rule_v1_clarify")
+    triples, bm25_index, lexical_index, kg_cache_hit = load_kg_with_indexes(
+        kg_path,
+        need_bm25=need_bm25,
+        need_lexical=args.retriever_type != "bm25",
+        use_cache=not getattr(args, "no_kg_cache", False),
+    )
 
     # 可选：启用 IntentEngine（Task 18）
     intent_engine: IntentEngine | None = None
     intent_audit: Dict[str, Any] | None = None
     if getattr(args, "intent_mode", "none") != "none":
-        intent_engine = IntentEngine()
+        intent_engine = get_intent_engine()
         intent_audit = intent_engine.get_audit_info()
 
     if not test_samples:
@@ -593,21 +1066,23 @@ def run_experiment(
     if not triples:
         raise RuntimeError(f"KG triples is empty: {kg_path}")
 
-    per_sample_results: List[Dict[str, Any]] = []
-    total_em = 0.0
-    total_f1 = 0.0
-
-    for ex in test_samples:
-        qid = ex.get("id") or ex.get("qid") or ""
-        question = ex.get("question") or ""
-        gold_answers = ex.get("gold_answers") or []
-
-        # --- IntentEngine 预测 ---
-        intent_pred: Dict[str, Any] | None = None
-        if intent_engine is not None:
-            intent_pred = intent_engine.predict(str(question))
-
-        # 默认检索/合同设置（可被 intent 路由覆盖）
+    # 整个运行复用一个生成端客户端（初始调用与 Policy R 重试、各并发线程共享连接池）
+    client: Any = None
+    # 进程内生成缓存：temperature == 0 时默认启用，否则需 --gen_cache 显式开启；--no_gen_cache 总是关闭
+    use_gen_cache = (getattr(args, "gen_cache", False) or GEN_TEMPERATURE == 0) and not getattr(
+        args, "no_gen_cache", False
+    )
+    response_cache: LLMCache | None = None
+    if not args.mock:
+        try:
+            client = _get_client(args.base_url, args.api_key)
+        except ImportError as e:
+            raise RuntimeError("导入 openai 失败，请先安装依赖：pip install openai") from e
+        if getattr(args, "persist_gen_cache", False):
+            response_cache = LLMCache(GEN_CACHE_DB_PATH)
+
+    def _route_retrieval(intent_pred: Dict[str, Any] | None) -> Tuple[str, int]:
+        # 默认检索设置（可被 intent 路由覆盖）
         retriever_type_local = args.retriever_type
         top_k_local = args.top_k
 
@@ -627,17 +1102,28 @@ def run_experiment(
             if is_multi_intent:
                 # 多意图样本：扩大检索范围
                 top_k_local = max(top_k_local, args.top_k * 2)
+        return retriever_type_local, top_k_local
+
+    def _skip_generation(retrieved: List[Triple]) -> bool:
+        # guardrail_v2 下空检索的 evidence 支持率恒为 None（violation），
+        # Policy B / Policy R 最终都必然判 UNKNOWN，请求生成端不会改变预测
+        return not retrieved and args.contract_variant == "answer_plus_evidence_guardrail_v2"
+
+    def _run_sample(
+        ex: Dict[str, Any],
+        intent_pred: Dict[str, Any] | None,
+        retrieved: List[Triple],
+        prefilled: tuple[str, str, int, str] | None = None,
+    ) -> Dict[str, Any]:
+        qid = ex.get("id") or ex.get("qid") or ""
+        question = ex.get("question") or ""
+        gold_answers = ex.get("gold_answers") or []
 
-        retrieved = retrieve_triples(
-            question,
-            triples,
-            top_k=top_k_local,
-            retriever_type=retriever_type_local,
-        )
-        if args.contract_variant in ("answer_plus_evidence", "answer_plus_evidence_guardrail_v2"):
-            context_str = format_context_with_ids(retrieved)
-        else:
-            context_str = format_context(retrieved)
+        # 只构建一次：既用于 evidence 支持率计算，也直接作为 per-sample 的 retrieved_triples
+        retrieved_dicts = [
+            {"subject": t.subject, "predicate": t.predicate, "object": t.obj} for t in retrieved
+        ]
+        context_str = _format_context_for_variant(args.contract_variant, retrieved)
 
         evidence_ids: list[int] = []
         evidence_meta: Dict[str, Any] | None = None
@@ -661,26 +1147,36 @@ def run_experiment(
             evidence_support = 1.0
             violation = False
             enforcement_action = "none"
-            em, f1 = evaluate_prediction(pred, gold_answers)
+            em, f1 = _evaluate_prediction(pred, gold_answers)
         else:
-            raw_pred, gen_status, attempts, last_err = generate_answer_local(
-                question=question,
-                context=context_str,
-                base_url=args.base_url,
-                model=args.model,
-                api_key=args.api_key,
-                mock=False,
-                contract_variant=args.contract_variant,
-            )
-            if args.contract_variant in ("answer_plus_evidence", "answer_plus_evidence_guardrail_v2"):
-                answer_text, evidence_ids, evidence_meta = _parse_answer_and_evidence(
-                    raw_pred,
-                    retrieved_k=len(retrieved),
+            if prefilled is not None:
+                # 首轮输出已由 Batch API 取得；Policy R 的重试仍走实时请求
+                raw_pred, gen_status, attempts, last_err = prefilled
+            elif _skip_generation(retrieved):
+                raw_pred, gen_status, attempts, last_err = "", "skipped_no_context", 0, ""
+            else:
+                raw_pred, gen_status, attempts, last_err = generate_answer_local(
+                    question=question,
+                    context=context_str,
+                    base_url=args.base_url,
+                    model=args.model,
+                    api_key=args.api_key,
+                    mock=False,
+                    contract_variant=args.contract_variant,
+                    client=client,
+                    use_cache=use_gen_cache,
+                    response_cache=response_cache,
                 )
+            if args.contract_variant in ("answer_plus_evidence", "answer_plus_evidence_guardrail_v2"):
+                if gen_status == "skipped_no_context":
+                    # 未请求生成端，没有模型输出可解析：不写 evidence_parse，也就不计入 evidence_line_parse_report
+                    answer_text, evidence_ids, evidence_meta = "", [], None
+                else:
+                    answer_text, evidence_ids, evidence_meta = _parse_answer_and_evidence(
+                        raw_pred,
+                        retrieved_k=len(retrieved),
+                    )
                 # 先基于原始 ANSWER 计算 evidence 支持率（support_semantics: raw_answer_only_v1）
-                retrieved_dicts = [
-                    {"subject": t.subject, "predicate": t.predicate, "object": t.obj} for t in retrieved
-                ]
                 evidence_support = _compute_single_evidence_support(
                     answer_text,
                     evidence_ids,
@@ -702,7 +1198,11 @@ def run_experiment(
                             pred = "UNKNOWN"
                     elif policy == "retry_once_if_support_lt_0.5_else_force_unknown":
                         # Policy R: violation 时先 retry 一次；若 retry 后仍 violation，force UNKNOWN
-                        if violation:
+                        if violation and gen_status == "skipped_no_context":
+                            # 空检索未请求生成端，重试同样没有可引用的上下文：直接 force UNKNOWN，不计为 retry
+                            enforcement_action = "force_unknown"
+                            pred = "UNKNOWN"
+                        elif violation:
                             retry_attempted = True
                             _log(f"[ENFORCE] id={qid} policy=R violation=True -> retry")
                             raw_retry, gen_status_retry, attempts_retry, _ = generate_answer_local(
@@ -714,6 +1214,9 @@ def run_experiment(
                                 mock=False,
                                 contract_variant=args.contract_variant,
                                 use_retry_prompt=True,
+                                client=client,
+                                use_cache=use_gen_cache,
+                                response_cache=response_cache,
                             )
                             if gen_status_retry == "success" and raw_retry.strip():
                                 ans_retry, evidence_ids_retry, _ = _parse_answer_and_evidence(
@@ -747,13 +1250,13 @@ def run_experiment(
                 else:
                     violation = False
                     enforcement_action = "none"
-                em, f1 = evaluate_prediction(pred, gold_answers)
+                em, f1 = _evaluate_prediction(pred, gold_answers)
             else:
                 pred = raw_pred
                 evidence_support = None
                 violation = False
                 enforcement_action = "none"
-                em, f1 = evaluate_prediction(pred, gold_answers)
+                em, f1 = _evaluate_prediction(pred, gold_answers)
 
         # 澄清模式（离线）：若样本被标记为歧义，则将最终答案强制为 UNKNOWN
         if (
@@ -762,12 +1265,11 @@ def run_experiment(
             and intent_pred.get("is_ambiguous")
         ):
             answer_before_clarify = pred
-            pred = "UNKNOWN"
             clarify_applied = True
-            em, f1 = evaluate_prediction(pred, gold_answers)
-
-        total_em += em
-        total_f1 += f1
+            if pred != "UNKNOWN":
+                # 答案未变时 EM/F1 不变，无需重新评测
+                pred = "UNKNOWN"
+                em, f1 = _evaluate_prediction(pred, gold_answers)
 
         row: Dict[str, Any] = {
             "id": qid,
@@ -779,9 +1281,7 @@ def run_experiment(
             "f1": f1,
             "generator_status": gen_status,
             "attempts": attempts,
-            "retrieved_triples": [
-                {"subject": t.subject, "predicate": t.predicate, "object": t.obj} for t in retrieved
-            ],
+            "retrieved_triples": retrieved_dicts,
             "evidence_support": evidence_support,
             "evidence_violation": bool(violation),
             "enforcement_action": enforcement_action,
@@ -819,7 +1319,87 @@ def run_experiment(
                 "config_fingerprint_intent": intent_audit.get("config_fingerprint_intent"),
             }
 
-        per_sample_results.append(row)
+        return row
+
+    # --- IntentEngine 预测 ---
+    # 规则匹配是纯 Python CPU 计算（受 GIL 限制，线程池无收益），在进入生成循环前一次性批量完成，
+    # 不再与各并发线程的 HTTP 等待交错争用 GIL。
+    if intent_engine is not None:
+        intent_preds: List[Dict[str, Any] | None] = [
+            intent_engine.predict(str(ex.get("question") or "")) for ex in test_samples
+        ]
+    else:
+        intent_preds = [None] * len(test_samples)
+
+    # --- 检索 ---
+    # 同为本地 CPU 计算：按各样本路由结果一次性批量检索，再交给生成循环
+    routes = [_route_retrieval(ip) for ip in intent_preds]
+    retrieved_all = retrieve_triples_batch(
+        [ex.get("question") or "" for ex in test_samples],
+        triples,
+        top_ks=[k for _, k in routes],
+        retriever_types=[rt for rt, _ in routes],
+        bm25_index=bm25_index,
+        lexical_index=lexical_index,
+    )
+
+    # --use_batch_api：首轮生成整体走 Batch API（半价、不占实时 RPM），未取得的样本再逐条实时请求
+    prefilled_all: List[tuple[str, str, int, str] | None] = [None] * len(test_samples)
+    batch_api_stats: Dict[str, Any] | None = None
+    if not args.mock and getattr(args, "use_batch_api", False):
+        # 不会请求生成端的样本（_skip_generation）不提交
+        batch_idx = [i for i, retrieved in enumerate(retrieved_all) if not _skip_generation(retrieved)]
+        prompts = [
+            _build_prompts(
+                args.contract_variant,
+                False,
+                _format_context_for_variant(args.contract_variant, retrieved_all[i]),
+                test_samples[i].get("question") or "",
+            )
+            for i in batch_idx
+        ]
+        batch_outputs, batch_api_stats = generate_answers_via_batch_api(
+            prompts,
+            model=args.model,
+            client=client,
+            batch_input_path=(artifacts_dir or CACHE_DIR) / "batch_input.jsonl",
+            log_fn=_log,
+            response_cache=response_cache,
+            contract_variant=args.contract_variant,
+            base_url=args.base_url,
+        )
+        for i, out in zip(batch_idx, batch_outputs):
+            prefilled_all[i] = out
+
+    # 评测为本地 CPU 计算，耗时主要在生成端 HTTP 往返；
+    # 真实模式下用线程池并发请求，pool.map 保证结果按样本原顺序返回。
+    concurrency = max(1, int(getattr(args, "concurrency", 1) or 1))
+    per_sample_results: List[Dict[str, Any]] = []
+    if args.mock or concurrency == 1 or len(test_samples) == 1:
+        rows: Iterable[Dict[str, Any]] = map(_run_sample, test_samples, intent_preds, retrieved_all, prefilled_all)
+        pool = None
+    else:
+        pool = ThreadPoolExecutor(max_workers=min(concurrency, len(test_samples)))
+        rows = pool.map(_run_sample, test_samples, intent_preds, retrieved_all, prefilled_all)
+    try:
+        for row in rows:
+            per_sample_results.append(row)
+            if row_sink is not None:
+                row_sink(row)
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+        # 生成端致命错误从 pool.map 抛出时也要关闭 SQLite 连接（须在线程池停止之后）
+        if response_cache is not None:
+            response_cache.close()
+    gen_cache_stats = response_cache.stats() if response_cache is not None else None
+
+    # EM/F1 保持顺序累加：np.mean 为 pairwise 求和，末位可能与历史 metrics 不一致
+    total_em = 0.0
+    total_f1 = 0.0
+    for row in per_sample_results:
+        total_em += row["em"]
+        total_f1 += row["f1"]
 
     n = len(per_sample_results)
     avg_em = total_em / n if n else 0.0
@@ -837,6 +1417,12 @@ def run_experiment(
             "EM": avg_em,
             "F1": avg_f1,
         },
+        "audit": {
+            "gen_cache_in_process": use_gen_cache,
+            "gen_cache_persistent": gen_cache_stats,
+            "kg_cache_hit": kg_cache_hit,
+            "generator_batch_api": batch_api_stats,
+        },
     }
     return metrics, per_sample_results
 
@@ -924,6 +1510,38 @@ def main() -> int:
         choices=["none", "rule_v1", "rule_v1_route", "rule_v1_clarify"],
         help="Intent module mode: none（关闭）/ rule_v1（仅打标）/ rule_v1_route（路由）/ rule_v1_clarify（路由+澄清）。",
     )
+    parser.add_argument(
+        "--no_kg_cache",
+        action="store_true",
+        help="Rebuild KG triples/retrieval indexes instead of reusing runs/.cache/kg",
+    )
+    parser.add_argument(
+        "--gen_cache",
+        action="store_true",
+        help="Reuse generator outputs for identical prompts within this run "
+        "(on by default only when the sampling temperature is 0)",
+    )
+    parser.add_argument(
+        "--no_gen_cache",
+        action="store_true",
+        help="Always call the generator, even for a prompt already answered in this run",
+    )
+    parser.add_argument(
+        "--persist_gen_cache",
+        action="store_true",
+        help="Reuse/store generator outputs in runs/.cache/llm_cache.db across runs (exact prompt match)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="Max in-flight generator requests in real mode (1 = serial)",
+    )
+    parser.add_argument(
+        "--use_batch_api",
+        action="store_true",
+        help="Submit first-pass generations as one OpenAI Batch API job (for ablation sweeps; may take hours)",
+    )
     args = parser.parse_args()
 
     set_seed(args.seed)
@@ -935,18 +1553,13 @@ def main() -> int:
     logger = DualLogger(run_dir, "run.log")
     start_time = datetime.now().isoformat()
 
-    # 避免在日志中泄露 API Key：对 --api_key 参数做脱敏
-    redacted_argv: list[str] = []
-    skip_next = False
-    for i, tok in enumerate(sys.argv):
-        if skip_next:
-            skip_next = False
-            continue
-        if tok == "--api_key" and i + 1 < len(sys.argv):
-            redacted_argv.extend(["--api_key", "****"])
-            skip_next = True
-        else:
-            redacted_argv.append(tok)
+    # 避免在日志与 repro_manifest 中泄露 API Key：对 --api_key 的取值（含 --api_key=... 形式）做脱敏
+    argv = sys.argv
+    secret_idx = {i + 1 for i, tok in enumerate(argv[:-1]) if tok == "--api_key"}
+    redacted_argv = [
+        "****" if i in secret_idx else ("--api_key=****" if tok.startswith("--api_key=") else tok)
+        for i, tok in enumerate(argv)
+    ]
 
     logger.log(f"argv: {' '.join(redacted_argv)}")
     logger.log(f"Baseline experiment started (run_id={exp_id})")
@@ -961,7 +1574,18 @@ def main() -> int:
             return 1
 
     try:
-        metrics, per_sample = run_experiment(args, log_fn=logger.log)
+        # per-sample 行随生成进度按样本顺序流式写出，不必等全部样本完成后再整体序列化
+        with JsonlWriter(artifacts_dir / "per_sample_results.jsonl") as results_w, JsonlWriter(
+            artifacts_dir / "per_sample_generator_status.jsonl"
+        ) as status_w:
+
+            def _write_row(s: Dict[str, Any]) -> None:
+                results_w.write(s)
+                status_w.write_line(_generator_status_line(s))
+
+            metrics, per_sample = run_experiment(
+                args, log_fn=logger.log, row_sink=_write_row, artifacts_dir=artifacts_dir
+            )
     except RuntimeError as e:
         logger.log(f"FATAL: {e}")
         print(str(e), file=sys.stderr)
@@ -983,14 +1607,7 @@ def main() -> int:
         "base_url": args.base_url,
         "model": args.model,
     }
-    if args.contract_variant == "answer_plus_evidence":
-        prompt_contract_version = PROMPT_CONTRACT_VERSION_ANSWER_EVIDENCE
-    elif args.contract_variant == "guardrail_answerable_only":
-        prompt_contract_version = PROMPT_CONTRACT_VERSION_GUARDRAIL
-    elif args.contract_variant == "answer_plus_evidence_guardrail_v2":
-        prompt_contract_version = PROMPT_CONTRACT_VERSION_ANSWER_EVIDENCE_GUARDRAIL_V2
-    else:
-        prompt_contract_version = PROMPT_CONTRACT_VERSION
+    audit_const = _AUDIT_CONST[args.contract_variant]
 
     default_cfg, config_fingerprint = _load_default_config_and_fingerprint()
     overrides: list[str] = []
@@ -1017,26 +1634,20 @@ def main() -> int:
                 overrides.append("enforcement_policy")
 
     if args.contract_variant == "answer_plus_evidence_guardrail_v2":
-        guardrail_version = "evidence_bounded_v2"
         policy = (args.enforcement_policy or "").strip()
         if not policy and default_cfg:
             policy = (default_cfg.get("guardrail") or {}).get("enforcement_policy", "")
         enforcement_policy = policy or "force_unknown_if_support_lt_0.5"
-        support_semantics_version = "raw_answer_only_v1"
-        from framework.evidence_support import get_module_sha256  # type: ignore
-
-        support_module_sha256 = get_module_sha256()
+        support_module_sha256 = _support_module_sha256()
     else:
-        guardrail_version = None
         enforcement_policy = "none"
-        support_semantics_version = None
         support_module_sha256 = None
 
     eval_sha = ""
     eval_path = ROOT / "framework" / "eval.py"
     if eval_path.exists():
         try:
-            eval_sha = hashlib.sha256(eval_path.read_bytes()).hexdigest()
+            eval_sha = _file_sha256(str(eval_path), _mtime_ns(eval_path))
         except Exception:
             pass
     api_key_source = None
@@ -1050,15 +1661,35 @@ def main() -> int:
     intent_thresholds = None
     intent_config_fingerprint_intent = None
     if intent_module_enabled:
-        from src.intent.intent_engine import IntentEngine as _IE  # type: ignore
-
-        _ie = _IE()
-        _info = _ie.get_audit_info()
+        # 与 run_experiment 共用同一实例，不再重新解析规则 YAML
+        _info = get_intent_engine().get_audit_info()
         intent_rules_sha256 = _info.get("rules_version_sha")
         intent_taxonomy_sha256 = _info.get("taxonomy_sha256")
         intent_thresholds = _info.get("thresholds")
         intent_config_fingerprint_intent = _info.get("config_fingerprint_intent")
 
+    # 单次遍历 per-sample，同时收集 intent 标记、evidence 解析标记、违约 id 与执行动作计数，供下方各汇总复用
+    intent_flags: List[Tuple[bool, bool, bool]] = []
+    parse_flags: List[Tuple[bool, bool, bool, bool]] = []
+    violation_ids: List[Any] = []
+    action_counter: Counter = Counter()
+    for s in per_sample:
+        ip = s.get("intent_pred") or {}
+        intent_flags.append((bool(ip.get("intents")), bool(ip.get("is_multi_intent")), bool(ip.get("is_ambiguous"))))
+        r = s.get("evidence_parse")
+        if r is not None:
+            parse_flags.append(
+                (
+                    bool(r.get("has_evidence_line")),
+                    bool(r.get("evidence_empty")),
+                    bool(r.get("evidence_out_of_range")),
+                    bool(r.get("evidence_has_duplicate")),
+                )
+            )
+        if s.get("evidence_violation"):
+            violation_ids.append(s.get("id", ""))
+        action_counter[s.get("enforcement_action", "none")] += 1
+
     # Intent 统计汇总（从 per-sample 反推）
     intent_multi_intent_rate = None
     intent_ambiguous_rate = None
@@ -1066,36 +1697,29 @@ def main() -> int:
     if intent_module_enabled:
         n_samples = len(per_sample)
         if n_samples > 0:
-            n_multi = 0
-            n_amb = 0
-            n_with_any_intent = 0
-            for s in per_sample:
-                ip = s.get("intent_pred") or {}
-                intents = ip.get("intents") or []
-                if intents:
-                    n_with_any_intent += 1
-                if ip.get("is_multi_intent"):
-                    n_multi += 1
-                if ip.get("is_ambiguous"):
-                    n_amb += 1
+            # 每样本一行 (has_intent, is_multi, is_ambiguous)，按列一次 count_nonzero 求三个计数
+            flags = np.array(intent_flags, dtype=np.bool_)
+            n_with_any_intent, n_multi, n_amb = np.count_nonzero(flags, axis=0).tolist()
             intent_multi_intent_rate = n_multi / n_samples
             intent_ambiguous_rate = n_amb / n_samples
             intent_coverage_rate = n_with_any_intent / n_samples
     audit = {
-        "eval_tokenizer": "mixed_zh_char_en_word_v1",
+        "eval_tokenizer": audit_const["eval_tokenizer"],
         "eval_py_sha256": eval_sha,
-        "eval_remove_en_articles": True,
-        "normalize_rules": "lower, remove_punc(en+cn), white_space_fix",
+        "eval_fast_py_sha256": _eval_fast_sha256(),
+        "eval_tokenizer_impl": _EVAL_TOKENIZER_IMPL,
+        "eval_remove_en_articles": audit_const["eval_remove_en_articles"],
+        "normalize_rules": audit_const["normalize_rules"],
         "config_fingerprint": config_fingerprint or None,
         "audit_overrides": overrides if overrides else None,
         "api_key_source": api_key_source,
         "generator_parse_version": GENERATOR_PARSE_VERSION,
-        "retry_policy": f"max_attempts={RETRY_MAX}",
-        "prompt_contract_version": prompt_contract_version,
+        "retry_policy": f"max_attempts={RETRY_MAX}, backoff=exp({RETRY_BACKOFF_BASE_S}s..{RETRY_BACKOFF_MAX_S}s)",
+        "prompt_contract_version": audit_const["prompt_contract_version"],
         "contract_variant": args.contract_variant,
-        "guardrail_version": guardrail_version,
+        "guardrail_version": audit_const["guardrail_version"],
         "enforcement_policy": enforcement_policy,
-        "support_semantics_version": support_semantics_version,
+        "support_semantics_version": audit_const["support_semantics_version"],
         "support_module_sha256": support_module_sha256,
         # Intent module audit
         "intent_module_enabled": intent_module_enabled,
@@ -1117,86 +1741,37 @@ def main() -> int:
         "generator_temperature": GEN_TEMPERATURE,
         "generator_top_p": GEN_TOP_P,
         "generator_max_tokens": GEN_MAX_TOKENS,
+        "generator_concurrency": 1 if args.mock else max(1, args.concurrency),
+        "generator_http2": (not args.mock) and HAS_H2,
         "seed": args.seed,
         "retriever_topk": args.top_k,
         "retriever_type": args.retriever_type,
     }
     metrics.setdefault("audit", {}).update(audit)
     core_metrics.save_metrics(metrics, metrics_path)
-    save_jsonl(per_sample, artifacts_dir / "per_sample_results.jsonl")
-
-    gen_status_rows = [
-        {"id": s.get("id"), "generator_status": s.get("generator_status", ""), "attempts": s.get("attempts", 1)}
-        for s in per_sample
-    ]
-    save_jsonl(gen_status_rows, artifacts_dir / "per_sample_generator_status.jsonl")
 
     # 记录本次运行使用的 prompt 契约模板（方便审计和复现）
-    if args.contract_variant == "answer_plus_evidence":
-        prompt_template = (
-            "=== System ===\n"
-            "你是一个知识库问答助手。输出契约：严格输出两行，且不要添加多余文本或解释。\n"
-            "Line1: ANSWER: <最终答案或 UNKNOWN>\n"
-            "Line2: EVIDENCE: <逗号分隔的行号，范围 1..K，对应给定 triples 的行号>\n\n"
-            "=== User (结构) ===\n"
-            "[Triples]\n每行格式: [i] subject: X\tpredicate: Y\tobject: Z\n"
-            "[Task]\n请仅根据上述 triples 回答，并按上述两行格式输出。\n"
-            f"prompt_contract_version={PROMPT_CONTRACT_VERSION_ANSWER_EVIDENCE}"
-        )
-    elif args.contract_variant == "answer_plus_evidence_guardrail_v2":
-        prompt_template = (
-            "=== System ===\n"
-            "你是一个知识库问答助手。输出契约：严格输出两行，且不要添加多余文本或解释。\n"
-            "Line1: ANSWER: <最终答案或 UNKNOWN>\n"
-            "Line2: EVIDENCE: <逗号分隔的行号，范围 1..K，对应给定 triples 的行号>\n"
-            "硬性约束：ANSWER 必须完全由 EVIDENCE 行中的内容（subject/object/数值/术语）拷贝或轻微改写得到；\n"
-            "若在任何 EVIDENCE 行中都找不到能支撑答案的内容，必须输出 UNKNOWN；"
-            "禁止使用 triples 之外的常识或背景知识；禁止解释；禁止多行输出。\n\n"
-            "=== User (结构) ===\n"
-            "[Triples]\n每行格式: [i] subject: X\tpredicate: Y\tobject: Z\n"
-            "[Task]\n请先选择支撑答案的 EVIDENCE 行号，然后仅基于这些 EVIDENCE 行构造答案；"
-            "若无法从 EVIDENCE 中得到答案，则输出 UNKNOWN。\n"
-            f"prompt_contract_version={PROMPT_CONTRACT_VERSION_ANSWER_EVIDENCE_GUARDRAIL_V2}, "
-            "guardrail_version=evidence_bounded_v2"
-        )
-    elif args.contract_variant == "guardrail_answerable_only":
-        prompt_template = (
-            "=== System ===\n"
-            "你是一个知识库问答助手。硬性约束：只能从给定 triples 中提取答案，绝对禁止编造不在 triples 中出现的事实；"
-            "若无法从 triples 得到答案，必须输出 UNKNOWN。输出契约：只输出最终答案或 UNKNOWN，不要解释。\n\n"
-            "=== User (结构) ===\n"
-            "[Triples]\n每行格式: subject: X\tpredicate: Y\tobject: Z\n"
-            "[Task]\n请仅根据上述 triples 回答。无法确定答案时必须输出 UNKNOWN，禁止凭常识或背景知识猜测。\n"
-            f"prompt_contract_version={PROMPT_CONTRACT_VERSION_GUARDRAIL}"
-        )
-    else:
-        prompt_template = (
-            "=== System ===\n"
-            "你是一个知识库问答助手。输出契约：只输出最终答案，不要解释。"
-            "若无法从给定的 triples 得到答案，请输出 UNKNOWN。\n\n"
-            "=== User (结构) ===\n"
-            "[Triples]\n每行格式: subject: X\tpredicate: Y\tobject: Z\n"
-            "[Task]\n请仅根据上述 triples 回答。只输出最终答案，不要解释。无法得到答案则输出 UNKNOWN。\n"
-            f"prompt_contract_version={PROMPT_CONTRACT_VERSION}"
-        )
-    (artifacts_dir / "prompt_template_used.txt").write_text(prompt_template, encoding="utf-8")
+    (artifacts_dir / "prompt_template_used.txt").write_text(
+        _render_prompt_template_used(args.contract_variant), encoding="utf-8"
+    )
 
     # 仅在 Answer+Evidence 合同下，输出 evidence 相关诊断工件
     if args.contract_variant in ("answer_plus_evidence", "answer_plus_evidence_guardrail_v2"):
         # 1) evidence 行解析成功率等
-        parse_rows = [s.get("evidence_parse") for s in per_sample if s.get("evidence_parse") is not None]
-        total = len(parse_rows)
+        total = len(parse_flags)
         if total > 0:
-            def _rate(fn) -> float:
-                return sum(1 for r in parse_rows if fn(r)) / total if total else 0.0
-
+            # 每行四个解析标记，五个比率由按列计数得到
+            flags = np.array(parse_flags, dtype=np.bool_)
+            has_line, empty, out_of_range = flags[:, 0], flags[:, 1], flags[:, 2]
+            n_line, n_empty, n_oor, n_dup = np.count_nonzero(flags, axis=0).tolist()
+            n_success = int(np.count_nonzero(has_line & ~out_of_range & ~empty))
             parse_summary = {
                 "n": total,
-                "parse_success_rate": _rate(lambda r: r.get("has_evidence_line") and not r.get("evidence_out_of_range") and not r.get("evidence_empty")),
-                "has_evidence_line_rate": _rate(lambda r: r.get("has_evidence_line")),
-                "empty_evidence_rate": _rate(lambda r: r.get("evidence_empty")),
-                "out_of_range_rate": _rate(lambda r: r.get("evidence_out_of_range")),
-                "has_duplicate_rate": _rate(lambda r: r.get("evidence_has_duplicate")),
+                "parse_success_rate": n_success / total,
+                "has_evidence_line_rate": n_line / total,
+                "empty_evidence_rate": n_empty / total,
+                "out_of_range_rate": n_oor / total,
+                "has_duplicate_rate": n_dup / total,
             }
         else:
             parse_summary = {
@@ -1207,25 +1782,15 @@ def main() -> int:
                 "out_of_range_rate": 0.0,
                 "has_duplicate_rate": 0.0,
             }
-        (artifacts_dir / "evidence_line_parse_report.json").write_text(
-            json.dumps(parse_summary, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        save_json(parse_summary, artifacts_dir / "evidence_line_parse_report.json")
 
         # 2) evidence 支持率诊断
         evidence_support = _compute_evidence_support_summary(per_sample)
-        (artifacts_dir / "evidence_support_summary.json").write_text(
-            json.dumps(evidence_support, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        save_json(evidence_support, artifacts_dir / "evidence_support_summary.json")
 
     # Guardrail v2 专属：证据违约与执行策略统计
     if args.contract_variant == "answer_plus_evidence_guardrail_v2":
         total_n = len(per_sample)
-        violation_ids = [s.get("id", "") for s in per_sample if s.get("evidence_violation")]
-        from collections import Counter
-
-        action_counter = Counter(s.get("enforcement_action", "none") for s in per_sample)
         violation_rate = len(violation_ids) / total_n if total_n else 0.0
         violation_report = {
             "n": total_n,
@@ -1233,10 +1798,7 @@ def main() -> int:
             "violation_ids": violation_ids,
             "enforcement_action_counts": dict(action_counter),
         }
-        (artifacts_dir / "evidence_violation_report.json").write_text(
-            json.dumps(violation_report, ensure_ascii=False, indent=2),
-            encoding="utf-8",
-        )
+        save_json(violation_report, artifacts_dir / "evidence_violation_report.json")
 
     # Repro manifest
     end_time = datetime.now().isoformat()
@@ -1246,7 +1808,7 @@ def main() -> int:
         run_id=exp_id,
         start_time=start_time,
         end_time=end_time,
-        command_argv=sys.argv,
+        command_argv=redacted_argv,
         seed=args.seed,
         inputs=inputs,
         config_dict={},
@@ -10,7 +10,6 @@ from __future__ import annotations
 
 import argparse
 import csv
-import json
 import random
 import sys
 from datetime import datetime
@@ -19,7 +18,7 @@ from pathlib import Path
 ROOT = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(ROOT))
 
-from core import set_seed, DualLogger, write_repro_manifest, save_json, save_jsonl, load_json, save_metrics  # type: ignore
+from core import set_seed, DualLogger, write_repro_manifest, save_json, save_jsonl, load_json, save_metrics, iter_jsonl  # type: ignore
 
 TASK_NAME = "task_kg_smoke"
 AUDIT_SAMPLE_N = 100
@@ -28,6 +27,8 @@ CASE_STUDIES_N = 8
 
 def _load_triples(path: Path) -> list[dict]:
     triples: list[dict] = []
+    # 实体/谓词在多行重复：相同字符串共享一个对象，后续建集合时哈希已缓存
+    pool: dict[str, str] = {}
     if path.suffix.lower() == ".tsv":
         import csv as csvmod
         with open(path, "r", encoding="utf-8") as f:
@@ -36,17 +37,20 @@ def _load_triples(path: Path) -> list[dict]:
                 s = (row.get("subject") or row.get("head") or "").strip()
                 p = (row.get("predicate") or row.get("connect") or "").strip()
                 o = (row.get("object") or row.get("tail") or "").strip()
-                triples.append({"subject": s, "predicate": p, "object": o})
+                triples.append(
+                    {"subject": pool.setdefault(s, s), "predicate": pool.setdefault(p, p), "object": pool.setdefault(o, o)}
+                )
     else:
-        with open(path, "r", encoding="utf-8") as f:
-            for line in f:
-                if not line.strip():
-                    continue
-                obj = json.loads(line)
-                s = (obj.get("subject") or obj.get("head") or "").strip()
-                p = (obj.get("predicate") or obj.get("connect") or "").strip()
-                o = (obj.get("object") or obj.get("tail") or "").strip()
-                triples.append({"subject": s, "predicate": p, "object": o})
+        # iter_jsonl 对缺失文件返回空迭代；这里仍需让 load_triples 检查失败
+        if not path.exists():
+            raise FileNotFoundError(f"triples file not found: {path}")
+        for obj in iter_jsonl(path):
+            s = (obj.get("subject") or obj.get("head") or "").strip()
+            p = (obj.get("predicate") or obj.get("connect") or "").strip()
+            o = (obj.get("object") or obj.get("tail") or "").strip()
+            triples.append(
+                {"subject": pool.setdefault(s, s), "predicate": pool.setdefault(p, p), "object": pool.setdefault(o, o)}
+            )
     return triples
 
 
@@ -109,8 +113,13 @@ def main() -> tuple[int, str]:
         logger.log(f"Loaded {n} triples")
 
         # Compute KG metrics for paper "图谱构建与质量分析"
-        entities = set(t["subject"] for t in triples) | set(t["object"] for t in triples)
-        relations = set(t["predicate"] for t in triples)
+        # 单次遍历同时收集实体与关系
+        entities: set[str] = set()
+        relations: set[str] = set()
+        for t in triples:
+            entities.add(t["subject"])
+            entities.add(t["object"])
+            relations.add(t["predicate"])
         n_entities = len(entities)
         n_relations = len(relations)
         # density: directed graph, E / (V*(V-1)) or E/V^2 when V large
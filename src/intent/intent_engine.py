@@ -29,6 +29,7 @@ API (per question):
     }
 """
 
+import functools
 import hashlib
 import json
 import re
@@ -56,7 +57,8 @@ def _load_yaml(path: Path) -> Dict[str, Any]:
     return data
 
 
-def _sha256_file(path: Path) -> str:
+@functools.lru_cache(maxsize=8)
+def _sha256_file_at(path: str, mtime_ns: int, size: int) -> str:
     h = hashlib.sha256()
     with open(path, "rb") as f:
         for chunk in iter(lambda: f.read(65536), b""):
@@ -64,6 +66,12 @@ def _sha256_file(path: Path) -> str:
     return h.hexdigest()
 
 
+def _sha256_file(path: Path) -> str:
+    # 按 (路径, mtime, size) 记忆化：get_intent_engine 每次调用都要取指纹，文件未改动时不再重读
+    st = Path(path).stat()
+    return _sha256_file_at(str(path), st.st_mtime_ns, st.st_size)
+
+
 def _canonical_json(obj: Dict[str, Any]) -> str:
     return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
 
@@ -444,5 +452,24 @@ class IntentEngine:
         return clar_q, candidates
 
 
-__all__ = ["IntentEngine"]
+# 默认配置的共享实例，键为 (rules_sha256, taxonomy_sha256)；规则/taxonomy 内容变化时重建
+_DEFAULT_ENGINES: Dict[Tuple[str, str], IntentEngine] = {}
+
+
+def get_intent_engine() -> IntentEngine:
+    """返回进程内共享的默认 IntentEngine（默认 taxonomy/rules，不启用模型）。
+
+    仅用于只读预测与审计；需要改写 thresholds 等状态的调用方应自行构造实例。
+    """
+
+    key = (_sha256_file(INTENT_RULES_PATH), _sha256_file(INTENT_TAXONOMY_PATH))
+    engine = _DEFAULT_ENGINES.get(key)
+    if engine is None:
+        engine = IntentEngine()
+        _DEFAULT_ENGINES.clear()
+        _DEFAULT_ENGINES[(engine.rules_sha, engine.taxonomy_sha)] = engine
+    return engine
+
+
+__all__ = ["IntentEngine", "get_intent_engine"]
 
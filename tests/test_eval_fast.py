@@ -0,0 +1,85 @@
+"""framework.eval_fast must score exactly like the reference framework.eval."""
+
+from pathlib import Path
+import random
+import sys
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from framework import eval as ref_eval
+from framework import eval_fast
+
+
+CASES = [
+    ("TCP", ["tcp"]),
+    ("The TCP protocol.", ["TCP", "UDP protocol"]),
+    ("传输控制协议", ["传输控制协议（TCP）", "TCP"]),
+    ("路由器 router", ["路由器", "router"]),
+    ("", ["UNKNOWN"]),
+    ("UNKNOWN", ["unknown"]),
+    ("  a  b\tc\n", ["a b c", "c b a"]),
+    ("3.14", ["314", "3 14"]),
+    ("，。！", ["!?"]),
+    ("OSI 七层模型", ["OSI七层模型", "七层"]),
+]
+
+_ALPHABET = list("abc ABC,.!?-") + list("路由器协议，。（）《》 ")
+
+
+def _assert_same(prediction, gold_answers):
+    ref = ref_eval.evaluate_prediction(prediction, gold_answers)
+    fast = eval_fast.evaluate_prediction(prediction, gold_answers)
+    assert fast == ref
+    assert [type(x) for x in fast] == [type(x) for x in ref]
+
+
+@pytest.mark.parametrize("prediction,gold_answers", CASES)
+def test_evaluate_prediction_matches_reference(prediction, gold_answers):
+    _assert_same(prediction, gold_answers)
+
+
+def test_evaluate_prediction_matches_reference_fuzz():
+    rng = random.Random(20240501)
+
+    def rand_text():
+        return "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(0, 12)))
+
+    for _ in range(2000):
+        golds = [rand_text() for _ in range(rng.randint(1, 3))]
+        _assert_same(rand_text(), golds)
+
+
+def test_evaluate_prediction_empty_gold_raises_like_reference():
+    with pytest.raises(ValueError):
+        ref_eval.evaluate_prediction("x", [])
+    with pytest.raises(ValueError):
+        eval_fast.evaluate_prediction("x", [])
+
+
+def test_segment_fast_matches_mixed_segmentation():
+    rng = random.Random(7)
+    texts = [p for p, _ in CASES] + [
+        "".join(rng.choice(_ALPHABET) for _ in range(rng.randint(0, 16))) for _ in range(2000)
+    ]
+    for text in texts:
+        norm = ref_eval.normalize_answer(text)
+        assert eval_fast.segment_fast(norm) == ref_eval.mixed_segmentation(norm)
+
+
+def test_reference_tokenizer_is_default_and_eval_py_is_pinned(monkeypatch):
+    monkeypatch.delenv("CWKGQA_FAST_TOKENIZE", raising=False)
+    assert not eval_fast._fast_tokenize_enabled()
+    monkeypatch.setenv("CWKGQA_FAST_TOKENIZE", "1")
+    # The fast path is only allowed while eval.py is the version it was verified against
+    expected = eval_fast._file_sha256(ref_eval.__file__) == eval_fast.REFERENCE_EVAL_SHA256
+    assert eval_fast._fast_tokenize_enabled() == expected
+
+
+def test_module_sha256_is_stable():
+    sha = eval_fast.get_module_sha256()
+    assert len(sha) == 64
+    assert sha == eval_fast.get_module_sha256()
@@ -0,0 +1,111 @@
+"""generate_answer_local retry / failure classification with a stub generator client."""
+
+from pathlib import Path
+from types import SimpleNamespace
+import importlib
+import sys
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+baseline = importlib.import_module("scripts.run_exp_baseline")
+
+
+class StubClient:
+    """Raises the queued exceptions in order, then answers; counts every request."""
+
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.n_requests = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **kwargs):
+        self.n_requests += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        message = SimpleNamespace(content="ANSWER: TCP")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message, text=None)])
+
+
+@pytest.fixture(autouse=True)
+def _no_backoff_sleep(monkeypatch):
+    monkeypatch.setattr(baseline.time, "sleep", lambda _s: None)
+
+
+def _generate(client, **kwargs):
+    return baseline.generate_answer_local(
+        "q", "ctx", "http://stub/v1", "m", "k", False, "baseline", client=client, **kwargs
+    )
+
+
+def test_connection_reset_is_retried():
+    client = StubClient([ConnectionResetError("reset by peer")])
+    assert _generate(client) == ("ANSWER: TCP", "success", 2, "")
+    assert client.n_requests == 2
+
+
+def test_connection_errors_exhaust_retries_per_sample():
+    client = StubClient([ConnectionResetError("reset")] * baseline.RETRY_MAX)
+    text, status, attempts, _ = _generate(client)
+    assert (text, status, attempts) == ("", "connection_fail", baseline.RETRY_MAX)
+    assert client.n_requests == baseline.RETRY_MAX
+
+
+def test_connection_refused_fails_fast():
+    client = StubClient([ConnectionRefusedError(111, "Connection refused")])
+    with pytest.raises(RuntimeError):
+        _generate(client)
+    assert client.n_requests == 1
+
+
+def test_unknown_errors_are_not_classified_by_message_text():
+    # A "5" (or "timeout") in an arbitrary error message is not an HTTP 5xx / timeout
+    assert baseline._classify_generation_error(ValueError("field 5 is invalid")) is None
+    assert baseline._classify_generation_error(ValueError("timeout must be positive")) is None
+    client = StubClient([ValueError("code 500")])
+    with pytest.raises(RuntimeError):
+        _generate(client)
+    assert client.n_requests == 1
+
+
+def test_timeouts_are_retried():
+    assert baseline._classify_generation_error(TimeoutError()) == "timeout"
+    client = StubClient([TimeoutError("timed out")])
+    assert _generate(client)[1:3] == ("success", 2)
+
+
+def test_shared_client_disables_sdk_retries_and_loop_covers_them():
+    openai = pytest.importorskip("openai")
+    baseline._get_client.cache_clear()
+    client = baseline._get_client("http://stub/v1", "k")
+    assert client.max_retries == 0
+    # Everything the SDK used to retry on its own is retried by the manual loop instead
+    assert baseline._classify_generation_error(openai.APIConnectionError(request=None)) == "connection_fail"
+    assert baseline._classify_generation_error(openai.APITimeoutError(request=None)) == "timeout"
+    stub = StubClient([openai.APIConnectionError(request=None)])
+    assert _generate(stub)[1:3] == ("success", 2)
+
+
+def test_cache_hits_report_zero_attempts(tmp_path):
+    from framework.llm_cache import LLMCache  # type: ignore
+
+    baseline._GEN_CACHE.clear()
+    client = StubClient([ConnectionResetError("reset")])
+    assert _generate(client, use_cache=True)[1:3] == ("success", 2)
+    # In-process hit: no request sent, so attempts is 0
+    assert _generate(client, use_cache=True) == ("ANSWER: TCP", "success", 0, "")
+    assert client.n_requests == 2
+
+    cache = LLMCache(tmp_path / "llm_cache.db")
+    try:
+        baseline._GEN_CACHE.clear()
+        client = StubClient()
+        assert _generate(client, response_cache=cache)[1:3] == ("success", 1)
+        assert _generate(client, response_cache=cache) == ("ANSWER: TCP", "success", 0, "")
+        assert client.n_requests == 1
+    finally:
+        cache.close()
+        baseline._GEN_CACHE.clear()
@@ -0,0 +1,58 @@
+"""Unit tests for core.io JSONL helpers."""
+
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.io import JsonlWriter, count_jsonl, iter_jsonl, load_json, load_jsonl, save_json, save_jsonl
+
+
+def test_count_jsonl_matches_load_jsonl(tmp_path):
+    path = tmp_path / "rows.jsonl"
+    save_jsonl([{"id": 1}, {"id": 2}, {"id": 3}], path)
+    # Blank lines are skipped by load_jsonl and must not be counted either
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n   \n")
+    assert count_jsonl(path) == len(load_jsonl(path)) == 3
+
+
+def test_count_jsonl_missing_file(tmp_path):
+    assert count_jsonl(tmp_path / "missing.jsonl") == 0
+
+
+def test_iter_jsonl_matches_load_jsonl(tmp_path):
+    path = tmp_path / "rows.jsonl"
+    rows = [{"subject": "路由器", "object": "TTL"}, {"id": 2, "x": [1.5, None]}]
+    save_jsonl(rows, path)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("\n")
+    assert list(iter_jsonl(path)) == load_jsonl(path) == rows
+    assert list(iter_jsonl(tmp_path / "missing.jsonl")) == []
+
+
+def test_jsonl_writer_matches_save_jsonl(tmp_path):
+    rows = [{"subject": "路由器", "object": "TTL"}, {"id": 2, "x": [1.5, None]}]
+    save_jsonl(rows, tmp_path / "bulk.jsonl")
+    with JsonlWriter(tmp_path / "sub" / "stream.jsonl") as w:
+        for row in rows:
+            w.write(row)
+    assert (tmp_path / "sub" / "stream.jsonl").read_bytes() == (tmp_path / "bulk.jsonl").read_bytes()
+
+
+def test_save_json_is_atomic_and_leaves_no_temp_file(tmp_path):
+    path = tmp_path / "out" / "report.json"
+    save_json({"old": True}, path)
+    save_json({"rate": 0.5, "ids": ["路由器"]}, path)
+    assert load_json(path) == {"rate": 0.5, "ids": ["路由器"]}
+    assert [p.name for p in path.parent.iterdir()] == ["report.json"]
+
+
+def test_iter_jsonl_keeps_stdlib_semantics_for_lenient_lines(tmp_path):
+    path = tmp_path / "rows.jsonl"
+    path.write_text('{"x": NaN}\n{"big": 123456789012345678901234567890}\n', encoding="utf-8")
+    rows = load_jsonl(path)
+    assert rows[0]["x"] != rows[0]["x"]  # NaN
+    assert rows[1] == {"big": 123456789012345678901234567890}
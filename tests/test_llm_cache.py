@@ -0,0 +1,41 @@
+"""Unit tests for framework.llm_cache persistent generator cache."""
+
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from framework.llm_cache import LLMCache
+
+
+def _key(question: str) -> str:
+    messages = [{"role": "system", "content": "sys"}, {"role": "user", "content": question}]
+    return LLMCache.make_key("http://localhost:11434/v1", "m", "answer_only", messages, {"temperature": 0.1, "seed": 42})
+
+
+def test_llm_cache_roundtrip_across_instances(tmp_path):
+    db = tmp_path / "cache" / "llm_cache.db"
+    cache = LLMCache(db)
+    assert cache.get(_key("路由器是什么")) is None
+    cache.set(_key("路由器是什么"), "网络设备", 2)
+    cache.set(_key("空答案"), "", 1)  # empty outputs are never stored
+    cache.close()
+
+    reopened = LLMCache(db)
+    assert reopened.get(_key("路由器是什么")) == ("网络设备", 2)
+    assert reopened.get(_key("空答案")) is None
+    assert reopened.stats()["hits"] == 1 and reopened.stats()["misses"] == 1
+    reopened.close()
+
+
+def test_llm_cache_key_depends_on_endpoint_sampling_and_contract():
+    messages = [{"role": "user", "content": "q"}]
+    url = "http://localhost:11434/v1"
+    base = LLMCache.make_key(url, "qwen", "answer_only", messages, {"temperature": 0.1})
+    assert base == LLMCache.make_key(url, "qwen", "answer_only", messages, {"temperature": 0.1})
+    assert base != LLMCache.make_key(url, "qwen", "answer_only", messages, {"temperature": 0.0})
+    assert base != LLMCache.make_key(url, "qwen", "answer_plus_evidence", messages, {"temperature": 0.1})
+    # Same model name served by another endpoint (e.g. Ollama vs vLLM) must not share answers
+    assert base != LLMCache.make_key("http://localhost:8000/v1", "qwen", "answer_only", messages, {"temperature": 0.1})
@@ -0,0 +1,110 @@
+"""_parse_answer_and_evidence against the original line-by-line parser."""
+
+from pathlib import Path
+import importlib
+import random
+import sys
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+baseline = importlib.import_module("scripts.run_exp_baseline")
+
+
+def _naive_parse(raw_text, retrieved_k):
+    """The pre-regex parser: strip every line and take the first ANSWER:/EVIDENCE: line."""
+    meta = {
+        "has_evidence_line": False,
+        "evidence_empty": False,
+        "evidence_out_of_range": False,
+        "evidence_has_duplicate": False,
+    }
+    if not raw_text.strip():
+        meta["evidence_empty"] = True
+        return "", [], meta
+
+    lines = [ln.strip() for ln in raw_text.splitlines() if ln.strip()]
+    answer = raw_text.strip()
+    evidence_ids = []
+    for ln in lines:
+        if ln.upper().startswith("ANSWER:"):
+            answer = ln[len("ANSWER:") :].strip()
+            break
+    for ln in lines:
+        if ln.upper().startswith("EVIDENCE:"):
+            meta["has_evidence_line"] = True
+            payload = ln[len("EVIDENCE:") :].strip()
+            if not payload:
+                meta["evidence_empty"] = True
+                break
+            raw_tokens = [t.strip() for t in payload.replace("，", ",").split(",") if t.strip()]
+            seen_raw = []
+            for tok in raw_tokens:
+                try:
+                    idx = int(tok)
+                except ValueError:
+                    continue
+                seen_raw.append(idx)
+                if idx < 1 or idx > max(retrieved_k, 0):
+                    meta["evidence_out_of_range"] = True
+                    continue
+                evidence_ids.append(idx)
+            if len(seen_raw) != len(set(seen_raw)):
+                meta["evidence_has_duplicate"] = True
+            break
+    return answer, sorted(set(evidence_ids)), meta
+
+
+CASES = [
+    ("ANSWER: TCP\nEVIDENCE: 1, 3", 5),
+    ("ANSWER: TCP\nEVIDENCE: 1，3，3", 5),
+    ("ANSWER: TCP\nEVIDENCE: 0, 6, 2", 5),
+    ("ANSWER: TCP\nEVIDENCE: -1, 2", 5),
+    ("ANSWER: TCP\nEVIDENCE: 1, 2", 0),
+    ("ANSWER: TCP\nEVIDENCE: 1, 2", -3),
+    ("ANSWER: TCP\nEVIDENCE:", 5),
+    ("ANSWER: TCP\nEVIDENCE:   ", 5),
+    ("ANSWER: TCP", 5),
+    ("EVIDENCE: 2\nANSWER: UDP", 5),
+    ("just an answer", 5),
+    ("", 5),
+    ("  \n\t", 5),
+    ("answer: lower case\nevidence: 2", 5),
+    ("  ANSWER:  padded  \n   EVIDENCE: 4 , x, 2,, ", 5),
+    ("ANSWER: first\nANSWER: second\nEVIDENCE: 1\nEVIDENCE: 2", 5),
+    ("ANSWER: crlf\r\nEVIDENCE: 3\r\n", 5),
+    ("ANSWER: cr only\rEVIDENCE: 3", 5),
+    ("ANSWER: ls\u2028EVIDENCE: 2\u2029", 5),
+    ("ANSWER: vt\x0bEVIDENCE: 1\x0c", 5),
+    ("ANSWER:\nEVIDENCE: 1", 5),
+    ("ANSWER: x EVIDENCE: 1", 5),
+    ("prefix ANSWER: no\nEVIDENCE: +2, 1_0, ３", 20),
+]
+
+
+@pytest.mark.parametrize("raw_text,retrieved_k", CASES)
+def test_parse_matches_naive(raw_text, retrieved_k):
+    assert baseline._parse_answer_and_evidence(raw_text, retrieved_k) == _naive_parse(raw_text, retrieved_k)
+
+
+def test_parse_cjk_comma_and_out_of_range_ids():
+    answer, ids, meta = baseline._parse_answer_and_evidence("ANSWER: 网络层\nEVIDENCE: 3，1，3，12", 10)
+    assert answer == "网络层"
+    assert ids == [1, 3]
+    assert meta["evidence_out_of_range"] is True
+    assert meta["evidence_has_duplicate"] is True
+
+
+def test_parse_matches_naive_fuzz():
+    rng = random.Random(99)
+    pieces = [
+        "ANSWER:", "answer:", "EVIDENCE:", "Evidence:", " ", "\t", "\n", "\r\n", "\r", " ", "\x85",
+        "1", "2", "3", "12", "-1", "0", ",", "，", "x", "TCP", "路由器",
+    ]
+    for _ in range(3000):
+        raw_text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 14)))
+        retrieved_k = rng.randint(-1, 4)
+        assert baseline._parse_answer_and_evidence(raw_text, retrieved_k) == _naive_parse(raw_text, retrieved_k)
@@ -0,0 +1,39 @@
+"""Unit tests for core.repro manifest input hashing."""
+
+import hashlib
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from core.repro import write_repro_manifest
+
+
+def test_manifest_hashes_inputs_in_order_and_warns_on_missing(tmp_path):
+    run_dir = tmp_path / "runs" / "exp"
+    inputs = []
+    for name in ("a.txt", "b.txt", "c.txt"):
+        p = tmp_path / name
+        p.write_bytes(name.encode("utf-8") * 1000)
+        inputs.append(p)
+    missing = tmp_path / "missing.txt"
+    inputs.insert(1, missing)
+
+    manifest = write_repro_manifest(
+        run_dir,
+        run_id="exp",
+        start_time="t0",
+        end_time="t1",
+        command_argv=["x"],
+        seed=0,
+        inputs=inputs,
+    )
+
+    hashes = manifest["input_files_sha256"]
+    assert list(hashes) == ["a.txt", "b.txt", "c.txt"]
+    for name, digest in hashes.items():
+        assert digest == hashlib.sha256((tmp_path / name).read_bytes()).hexdigest()
+    assert manifest["warnings"] == [f"Input missing: {missing}"]
+    assert (run_dir / "repro_manifest.json").exists()